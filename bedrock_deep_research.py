@@ -70,6 +70,13 @@ def init_state():
             st.session_state[key] = default_st_val
 
 
+def close_bedrock_deep_research():
+    """Closes the workflow of the previous article, if any."""
+    if st.session_state.bedrock_deep_research is not None:
+        st.session_state.bedrock_deep_research.close()
+        st.session_state.bedrock_deep_research = None
+
+
 def render_initial_form():
     """
     Renders the initial form for article generation with topic and writing_guidelines inputs.
@@ -139,6 +146,7 @@ def render_initial_form():
                     }
                 }
 
+                close_bedrock_deep_research()
                 st.session_state.bedrock_deep_research = BedrockDeepResearch(
                     config=config, tavily_api_key=os.getenv("TAVILY_API_KEY")
                 )
@@ -233,7 +241,7 @@ def render_final_result(article_container):
 
     with col2:
         if st.button("Start Over"):
-            st.session_state.bedrock_deep_research = None
+            close_bedrock_deep_research()
             st.session_state.stage = "initial_form"
 
             st.rerun()
@@ -0,0 +1,137 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+from langchain_aws import ChatBedrock
+
+logger = logging.getLogger(__name__)
+
+# Enough connections for the concurrent model calls of the parallel section subgraphs
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_READ_TIMEOUT = 300
+
+
+class BedrockClientRegistry:
+    """
+    Process-wide Bedrock runtime clients and chat models, created once and shared by all
+    the nodes. All clients come from a single boto3 session, so credentials are resolved
+    once, and each client keeps a connection pool sized for the section fan-out.
+
+    ChatBedrock has no native async API, its async methods run the blocking calls on the
+    default executor of the loop, only cpu_count + 4 threads. The async model calls run
+    on an executor of the registry instead, with a thread per pooled connection.
+
+    Attributes:
+        max_pool_connections (int): Maximum open connections per client
+        read_timeout (int): Seconds to wait for a model response
+    """
+
+    def __init__(
+        self,
+        max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+        read_timeout: int = DEFAULT_READ_TIMEOUT,
+    ):
+        self.max_pool_connections = max_pool_connections
+        self.read_timeout = read_timeout
+        self._session = boto3.Session()
+        self._clients: Dict[Optional[str], Any] = {}
+        self._models: Dict[Tuple, ChatBedrock] = {}
+        self._lock = threading.Lock()
+        self._executor = self._create_executor()
+
+    def set_max_pool_connections(self, max_pool_connections: int) -> None:
+        """Grows the connection pools, the clients are recreated on next use."""
+        with self._lock:
+            if max_pool_connections <= self.max_pool_connections:
+                return
+            logger.info(
+                f"Growing Bedrock connection pools to {max_pool_connections}")
+            self.max_pool_connections = max_pool_connections
+            self._clients.clear()
+            self._models.clear()
+            # The calls in flight finish on the previous executor
+            self._executor.shutdown(wait=False)
+            self._executor = self._create_executor()
+
+    async def arun(self, func: Callable, *args, **kwargs):
+        """
+        Runs the blocking model call on the executor of the registry, in a copy of the
+        current context so that the callbacks of the run (e.g. token streaming) still apply.
+        """
+        with self._lock:
+            executor = self._executor
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, functools.partial(context.run, func, *args, **kwargs))
+
+    def get_client(self, region: Optional[str] = None):
+        """Returns the bedrock-runtime client of the region, the session region by default."""
+        with self._lock:
+            return self._get_client(region)
+
+    def get_chat_model(
+        self,
+        model_id: str,
+        max_tokens: Optional[int] = None,
+        region: Optional[str] = None,
+        streaming: bool = False,
+        use_converse: bool = False,
+    ) -> ChatBedrock:
+        """Returns the chat model for the parameters, created on first use."""
+        key = (model_id, max_tokens, region, streaming, use_converse)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                kwargs = {"max_tokens": max_tokens} if max_tokens else {}
+                model = ChatBedrock(
+                    model_id=model_id,
+                    client=self._get_client(region),
+                    region_name=region or self._session.region_name,
+                    streaming=streaming,
+                    beta_use_converse_api=use_converse,
+                    **kwargs,
+                )
+                self._models[key] = model
+            return model
+
+    def _create_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=self.max_pool_connections, thread_name_prefix="bedrock-call")
+
+    def _get_client(self, region: Optional[str]):
+        client = self._clients.get(region)
+        if client is None:
+            client = self._session.client(
+                "bedrock-runtime",
+                region_name=region,
+                config=Config(
+                    max_pool_connections=self.max_pool_connections,
+                    read_timeout=self.read_timeout,
+                    # Retries are left to the retry engine, which adapts the concurrency to throttling
+                    retries={"mode": "standard", "total_max_attempts": 1},
+                ),
+            )
+            self._clients[region] = client
+        return client
+
+
+_registry: Optional[BedrockClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_bedrock_clients(max_pool_connections: Optional[int] = None) -> BedrockClientRegistry:
+    """Returns the process-wide client registry, growing its connection pools if needed."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = BedrockClientRegistry(
+                max_pool_connections or DEFAULT_MAX_POOL_CONNECTIONS)
+    if max_pool_connections:
+        _registry.set_max_pool_connections(max_pool_connections)
+    return _registry
@@ -0,0 +1,226 @@
+"""
+Generates articles for many topics without the Streamlit app.
+
+Topics are read one per line from a file, or from stdin; blank lines and lines
+starting with # are skipped. Outlines are approved automatically, after applying
+the optional canned feedback. The articles run concurrently on a single graph, each
+in its own thread, so they share the search, LLM and prompt caches and the Bedrock
+concurrency limits. Each article is written to output_dir with its node metrics,
+and a run_stats.json reports throughput and per-article latency.
+
+Usage:
+    python -m bedrock_deep_research.cli topics.txt --concurrency 4
+    cat topics.txt | python -m bedrock_deep_research.cli --feedback "Add a section on costs"
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+from .config import Configuration
+from .graph import BedrockDeepResearch
+from .search_backends import ReplaySearchBackend
+
+logger = logging.getLogger(__name__)
+LOGLEVEL = os.environ.get("LOGLEVEL", "INFO").upper()
+
+
+@dataclass
+class ArticleResult:
+    """Outcome of the generation of one article."""
+
+    topic: str
+    thread_id: str
+    latency_seconds: float = 0.0
+    outline_seconds: float = 0.0
+    output_path: Optional[str] = None
+    head_image_path: Optional[str] = None
+    metrics_path: Optional[str] = None
+    # Wall time, tokens, retries and searches of the nodes of the article
+    metrics: Optional[dict] = None
+    # Queries of the article answered by its source corpus
+    corpus: Optional[dict] = None
+    error: Optional[str] = None
+
+
+def read_topics(path: str) -> List[str]:
+    """Returns the topics of the file, one per line, or of stdin when path is '-'."""
+    text = sys.stdin.read() if path == "-" else Path(path).read_text(encoding="utf-8")
+    return [
+        line.strip()
+        for line in text.splitlines()
+        if line.strip() and not line.strip().startswith("#")
+    ]
+
+
+def _slug(text: str, max_length: int = 40) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")[:max_length] or "article"
+
+
+async def generate_article(
+    research: BedrockDeepResearch,
+    topic: str,
+    feedback: List[str],
+    output_dir: Path,
+    semaphore: asyncio.Semaphore,
+) -> ArticleResult:
+    """Runs the workflow for a topic in its own thread and writes the article to output_dir."""
+    result = ArticleResult(topic=topic, thread_id=str(uuid.uuid4()))
+    article_name = f"{_slug(topic)}_{result.thread_id[:8]}"
+    async with semaphore:
+        start = time.monotonic()
+        try:
+            await research.astart(topic, thread_id=result.thread_id)
+            result.outline_seconds = time.monotonic() - start
+            for message in feedback:
+                await research.afeedback(message, thread_id=result.thread_id)
+            await research.afeedback(True, thread_id=result.thread_id)
+
+            state = await research.aget_state(thread_id=result.thread_id)
+            final_report = state.values.get("final_report")
+            if not final_report:
+                raise RuntimeError("The workflow ended without a final report")
+
+            output_path = output_dir / f"{article_name}.md"
+            await asyncio.to_thread(output_path.write_text, final_report, encoding="utf-8")
+            result.output_path = str(output_path)
+            if state.values.get("head_image_path"):
+                result.head_image_path = str(state.values["head_image_path"])
+        except Exception as e:
+            logger.error(f"Article on '{topic}' failed: {e}")
+            result.error = f"{type(e).__name__}: {e}"
+        result.latency_seconds = time.monotonic() - start
+
+    result.metrics = research.get_metrics(result.thread_id)["totals"]
+    result.corpus = research.get_search_stats(result.thread_id)["corpus"]
+    result.metrics_path = str(await asyncio.to_thread(
+        research.export_metrics, output_dir / f"{article_name}.metrics.json", result.thread_id))
+    status = "failed" if result.error else f"written to {result.output_path}"
+    logger.info(
+        f"Article on '{topic}' {status} in {result.latency_seconds:.1f} seconds")
+    return result
+
+
+def summarize(results: List[ArticleResult], wall_seconds: float) -> dict:
+    """Returns the throughput and latency stats of the run."""
+    latencies = sorted(r.latency_seconds for r in results if not r.error)
+    succeeded = len(latencies)
+    return {
+        "articles": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "wall_seconds": wall_seconds,
+        "articles_per_hour": succeeded * 3600 / wall_seconds if wall_seconds else 0.0,
+        "latency_seconds_mean": statistics.mean(latencies) if latencies else 0.0,
+        "latency_seconds_p50": statistics.median(latencies) if latencies else 0.0,
+        "latency_seconds_p95": (
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0),
+        "latency_seconds_max": latencies[-1] if latencies else 0.0,
+    }
+
+
+async def run_batch(
+    research: BedrockDeepResearch,
+    topics: List[str],
+    feedback: List[str],
+    output_dir: Path,
+    concurrency: int,
+) -> dict:
+    """Generates the articles of the topics, at most `concurrency` at a time, and returns the run stats."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    start = time.monotonic()
+    results = await asyncio.gather(
+        *(generate_article(research, topic, feedback, output_dir, semaphore) for topic in topics)
+    )
+    wall_seconds = time.monotonic() - start
+
+    return {
+        "summary": summarize(results, wall_seconds),
+        "articles": [asdict(result) for result in results],
+        "search": research.get_search_stats(),
+        "llm": research.get_llm_stats(),
+        "routes": research.get_route_stats(),
+        "prompt_cache": research.get_prompt_cache_stats(),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("topics", nargs="?", default="-",
+                        help="File with one topic per line, '-' for stdin")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Maximum number of articles generated at once")
+    parser.add_argument("--feedback", action="append", default=[],
+                        help="Feedback applied to every outline before approving it, can be repeated")
+    parser.add_argument("--output-dir",
+                        help="Directory of the articles, the output_dir of the configuration by default")
+    parser.add_argument("--config", type=json.loads, default={},
+                        help='Configuration fields as JSON, e.g. \'{"max_search_depth": 1}\'')
+    parser.add_argument("--replay-search", metavar="DIR",
+                        help="Serve the searches from saved search results instead of Tavily")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    load_dotenv()
+    logging.basicConfig(
+        level=LOGLEVEL,
+        force=True,
+        format="%(levelname)s:%(filename)s:L%(lineno)d - %(message)s",
+    )
+    args = parse_args(argv)
+
+    topics = read_topics(args.topics)
+    if not topics:
+        logger.error("No topics to generate")
+        return 1
+
+    config = {"configurable": {"thread_id": str(uuid.uuid4()), **args.config}}
+    if args.output_dir:
+        # The head images are saved in output_dir too
+        config["configurable"]["output_dir"] = args.output_dir
+    output_dir = Path(Configuration.from_runnable_config(config).output_dir)
+
+    research = BedrockDeepResearch(
+        config=config,
+        tavily_api_key=os.getenv("TAVILY_API_KEY"),
+        search_backend=ReplaySearchBackend(
+            args.replay_search) if args.replay_search else None,
+    )
+    logger.info(
+        f"Generating {len(topics)} articles, {args.concurrency} at a time, into {output_dir}")
+    try:
+        stats = asyncio.run(run_batch(
+            research, topics, args.feedback, output_dir, max(1, args.concurrency)))
+    finally:
+        research.close()
+
+    stats_path = output_dir / "run_stats.json"
+    stats_path.write_text(json.dumps(
+        stats, indent=2, default=str), encoding="utf-8")
+
+    summary = stats["summary"]
+    print(
+        f"{summary['succeeded']}/{summary['articles']} articles in {summary['wall_seconds']:.1f}s "
+        f"({summary['articles_per_hour']:.1f}/hour), latency mean={summary['latency_seconds_mean']:.1f}s "
+        f"p95={summary['latency_seconds_p95']:.1f}s. Stats written to {stats_path}"
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
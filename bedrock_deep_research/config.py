@@ -1,5 +1,6 @@
+import json
 import os
-from dataclasses import dataclass, fields
+from dataclasses import dataclass, field, fields
 from typing import Any, Optional
 
 from langchain_core.runnables import RunnableConfig
@@ -30,6 +31,62 @@ SUPPORTED_MODELS = {
 }
 
 
+@dataclass(frozen=True)
+class ModelSettings:
+    """Limits and capabilities of a Bedrock model."""
+
+    context_window: int  # Maximum input + output tokens
+    prompt_caching: bool = False  # Whether Bedrock prompt caching is available for the model
+    min_cache_tokens: int = 1024  # Minimum prompt prefix tokens for a cache checkpoint to apply
+    input_price: float = 0.0  # USD per million input tokens
+    output_price: float = 0.0  # USD per million output tokens
+
+
+DEFAULT_MODEL_SETTINGS = ModelSettings(context_window=200000)
+
+MODEL_SETTINGS = {
+    "us.anthropic.claude-3-5-haiku-20241022-v1:0": ModelSettings(
+        context_window=200000, prompt_caching=True, min_cache_tokens=2048,
+        input_price=0.8, output_price=4.0),
+    "us.anthropic.claude-3-5-sonnet-20241022-v2:0": ModelSettings(
+        context_window=200000, input_price=3.0, output_price=15.0),
+    "us.anthropic.claude-3-7-sonnet-20250219-v1:0": ModelSettings(
+        context_window=200000, prompt_caching=True, min_cache_tokens=1024,
+        input_price=3.0, output_price=15.0),
+}
+
+
+def get_model_settings(model_id: str) -> ModelSettings:
+    return MODEL_SETTINGS.get(model_id, DEFAULT_MODEL_SETTINGS)
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """The model serving a call site of the workflow."""
+
+    model_id: str
+    max_tokens: int
+
+
+# Call sites of the workflow, each routed to a model
+ROUTE_QUERY_GENERATION = "query_generation"
+ROUTE_OUTLINE = "outline"
+ROUTE_DRAFT = "draft"
+ROUTE_GRADE = "grade"
+ROUTE_FINAL_SECTIONS = "final_sections"
+ROUTE_IMAGE_PROMPT = "image_prompt"
+
+# Model used by each route when not overridden: the planner or the writer model
+DEFAULT_ROUTES = {
+    ROUTE_QUERY_GENERATION: "planner_model",
+    ROUTE_OUTLINE: "planner_model",
+    ROUTE_DRAFT: "writer_model",
+    ROUTE_GRADE: "writer_model",
+    ROUTE_FINAL_SECTIONS: "writer_model",
+    ROUTE_IMAGE_PROMPT: "writer_model",
+}
+
+
 @dataclass(kw_only=True)
 class Configuration:
     """The configurable fields for the chatbot."""
@@ -40,11 +97,79 @@ class Configuration:
 """
     number_of_queries: int = 2  # Number of search queries to generate per iteration
     max_search_depth: int = 2  # Maximum number of reflection + search iterations
+    max_follow_up_queries: int = 3  # Maximum follow-up queries searched per iteration
+    # Estimated lexical similarity above which a follow-up query repeats an earlier one
+    query_similarity_threshold: float = 0.5
+    # Start writing a section once this many unique sources arrived, 0 waits for every query
+    search_min_sources: int = 0
     max_tokens: int = 2048
+    # Maximum tokens of web sources put in a prompt, further capped by the model context window
+    max_source_tokens: int = 8000
     planner_model: str = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
     writer_model: str = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
     output_dir: str = "output"
     image_model: str = "amazon.nova-canvas-v1:0"
+    search_cache_enabled: bool = True  # Reuse Tavily responses for repeated queries
+    search_cache_dir: str = "search_cache"
+    search_cache_ttl: int = 86400  # Seconds before a cached search response expires
+    search_cache_max_entries: int = 1000
+    search_requests_per_second: float = 5.0  # Process-wide Tavily request rate
+    search_burst: int = 5  # Requests allowed at once before the rate applies
+    search_max_concurrency: int = 8  # Maximum Tavily requests in flight
+    search_timeout: float = 30.0  # Seconds after which a search query is abandoned
+    # Latency percentile (e.g. 0.95) after which a slow query is sent again, 0 disables hedging
+    search_hedge_percentile: float = 0.0
+    # Request full page contents with every search instead of on demand
+    search_include_raw_content: bool = False
+    page_store_dir: str = "page_store"  # Content-addressed store of full page contents
+    # Add the passages of the full pages most relevant to the section to the writer prompt
+    section_use_raw_content: bool = False
+    # Token budget of the sources from previous search iterations shown again to the section writer
+    max_prior_source_tokens: int = 2000
+    # Token budget of each researched section in the digest given to the introduction and conclusion writers
+    digest_section_tokens: int = 300
+    final_sections_use_full_draft: bool = False  # Give them the full researched sections instead
+    # Connections per Bedrock client, sized for the concurrent calls of the parallel sections
+    bedrock_max_pool_connections: int = 50
+    # Bounds of the adaptive limit of concurrent calls to each Bedrock model
+    llm_min_concurrency: int = 1
+    llm_max_concurrency: int = 16
+    # Reuse the responses of identical model calls, from an SQLite database
+    llm_cache_enabled: bool = False
+    llm_cache_path: str = "llm_cache.sqlite"
+    llm_cache_ttl: int = 604800  # Seconds a cached response stays valid
+    llm_cache_max_entries: int = 10000
+    # Add cache checkpoints after the static prompt prefixes long enough for the model to cache them
+    prompt_caching_enabled: bool = True
+    # Answer section queries from the sources already fetched during the run when they cover them
+    use_source_corpus: bool = True
+    corpus_min_results: int = 3  # Matching sources needed to skip the web search for a query
+    corpus_min_term_coverage: float = 0.75  # Fraction of the query terms a source must contain
+    # Model of each call site overriding the defaults, by route name:
+    # {"grade": {"model_id": "...", "max_tokens": 1024}} or {"grade": "<model id>"}
+    model_routes: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        supported_models = set(SUPPORTED_MODELS.values())
+        for name, route in self.model_routes.items():
+            if name not in DEFAULT_ROUTES:
+                raise ValueError(
+                    f"Unknown model route '{name}', expected one of {sorted(DEFAULT_ROUTES)}")
+            model_id = route if isinstance(route, str) else route.get("model_id")
+            if model_id is not None and model_id not in supported_models:
+                raise ValueError(
+                    f"Model '{model_id}' of route '{name}' is not a supported model")
+
+    def route(self, name: str) -> ModelRoute:
+        """Returns the model and max_tokens of a call site."""
+        route = self.model_routes.get(name) or {}
+        if isinstance(route, str):
+            route = {"model_id": route}
+        return ModelRoute(
+            model_id=route.get("model_id") or getattr(
+                self, DEFAULT_ROUTES[name]),
+            max_tokens=route.get("max_tokens") or self.max_tokens,
+        )
 
     @classmethod
     def from_runnable_config(
@@ -55,9 +180,22 @@ class Configuration:
             config["configurable"] if config and "configurable" in config else {}
         )
         values: dict[str, Any] = {
-            f.name: os.environ.get(f.name.upper(), configurable.get(f.name))
+            f.name: _coerce(f.type, os.environ.get(f.name.upper(), configurable.get(f.name)))
             for f in fields(cls)
             if f.init
         }
 
-        return cls(**{k: v for k, v in values.items() if v})
+        return cls(**{k: v for k, v in values.items() if v is not None and v != ""})
+
+
+def _coerce(field_type: Any, value: Any) -> Any:
+    """Convert string values coming from environment variables to the field type."""
+    if not isinstance(value, str) or field_type is str:
+        return value
+    if field_type is bool:
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if field_type in (int, float):
+        return field_type(value)
+    if field_type is dict:
+        return json.loads(value)
+    return value
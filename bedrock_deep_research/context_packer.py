@@ -0,0 +1,123 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from .config import get_model_settings
+from .retrieval import select_passages
+from .tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Tokens kept free in the context window for the prompt template and the section text
+PROMPT_RESERVE_TOKENS = 4000
+
+
+def source_token_budget(model_id: str, max_output_tokens: int, max_source_tokens: int) -> int:
+    """Token budget for the sources of a prompt, bounded by the context window of the model."""
+    context_window = get_model_settings(model_id).context_window
+    available = context_window - max_output_tokens - PROMPT_RESERVE_TOKENS
+    return max(0, min(max_source_tokens, available))
+
+
+def pack_sources(
+    sources: List[Dict[str, Any]],
+    token_budget: int,
+    include_raw_content: bool = False,
+    focus_queries: Optional[List[str]] = None,
+    header: str = "Sources:\n\n",
+) -> str:
+    """
+    Formats the sources for a prompt within a total token budget.
+
+    Sources are taken by decreasing score. The title, URL and summary of each source are
+    included while they fit. With include_raw_content, the remaining budget is shared
+    between the full page contents in proportion to the source scores. Budget a source
+    does not need goes to the others. When focus queries are given, the passages of each
+    page most relevant to them are kept instead of the beginning of the page.
+
+    Args:
+        sources: Search results with title, url, content, score and optionally raw_content
+        token_budget: Maximum estimated tokens of the returned string
+        include_raw_content: Whether to include the full page contents
+        focus_queries: Texts the kept passages of the full page contents should be relevant to
+        header: Text placed before the sources
+
+    Returns:
+        str: The formatted sources
+    """
+    remaining = token_budget - estimate_tokens(header)
+
+    selected = []
+    for source in sorted(sources, key=lambda s: s.get("score") or 0.0, reverse=True):
+        entry = (
+            f"Source {source['title']}:\n===\n"
+            f"URL: {source['url']}\n===\n"
+            f"Most relevant content from source: {source['content']}\n===\n"
+        )
+        cost = estimate_tokens(entry)
+        if cost > remaining:
+            break
+        remaining -= cost
+        selected.append((source, entry))
+
+    if len(selected) < len(sources):
+        logger.info(
+            f"Packed {len(selected)} of {len(sources)} sources in {token_budget} tokens")
+
+    raw_budgets = {}
+    if include_raw_content:
+        raw_budgets = _allocate_raw_content(
+            [source for source, _ in selected], remaining)
+
+    parts = [header]
+    for i, (source, entry) in enumerate(selected):
+        parts.append(entry)
+        if i in raw_budgets:
+            tokens = raw_budgets[i]
+            if focus_queries:
+                raw_content = select_passages(
+                    source["raw_content"], focus_queries, tokens)
+                parts.append(
+                    f"Most relevant passages of the full source content: {raw_content}\n\n")
+            else:
+                raw_content = truncate_to_tokens(source["raw_content"], tokens)
+                parts.append(
+                    f"Full source content limited to {tokens} tokens: {raw_content}\n\n")
+
+    return "".join(parts).strip()
+
+
+def _allocate_raw_content(sources: List[Dict[str, Any]], budget: int) -> Dict[int, int]:
+    """
+    Splits the budget between the raw contents in proportion to the source scores,
+    capping each share at the size of the content and redistributing the surplus.
+    Returns the token budget by source index.
+    """
+    # Fixed wording around each raw content
+    overhead = estimate_tokens("Full source content limited to 00000 tokens: ")
+    needs = {}
+    for i, source in enumerate(sources):
+        raw_content = source.get("raw_content")
+        if raw_content:
+            needs[i] = estimate_tokens(raw_content)
+        else:
+            logger.warning(
+                f"Warning: No raw_content found for source {source['url']}")
+
+    allocation = {}
+    while needs and budget > overhead * len(needs):
+        weights = {i: max(sources[i].get("score") or 0.0, 0.01)
+                   for i in needs}
+        total_weight = sum(weights.values())
+        available = budget - overhead * len(needs)
+        shares = {i: int(available * w / total_weight)
+                  for i, w in weights.items()}
+
+        satisfied = [i for i in needs if needs[i] <= shares[i]]
+        if not satisfied:
+            allocation.update({i: shares[i] for i in needs if shares[i] > 0})
+            break
+        for i in satisfied:
+            allocation[i] = needs.pop(i)
+            budget -= allocation[i] + overhead
+
+    return allocation
@@ -0,0 +1,80 @@
+import re
+from typing import List
+
+from .model import Section
+from .tokens import estimate_tokens, truncate_to_tokens
+
+_HEADING = re.compile(r"^\s*#{1,6}\s+(.*)$")
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d+\.)\s+")
+_TABLE_ROW = re.compile(r"^\s*\|")
+_FIRST_SENTENCE = re.compile(r"^(.+?[.!?])(?:\s|$)")
+
+
+def _key_claims(content: str) -> tuple[List[str], List[str]]:
+    """
+    Returns the headings and the key claims of a section: the bold statements first,
+    then the first sentence of each paragraph and list item. The sources are skipped.
+    """
+    headings, bold, leads = [], [], []
+    for block in re.split(r"\n\s*\n", content):
+        lines = [line for line in block.strip().splitlines() if line.strip()]
+        if not lines:
+            continue
+
+        heading = _HEADING.match(lines[0])
+        if heading:
+            title = heading.group(1).strip()
+            if title.lower() == "sources":
+                break
+            headings.append(title)
+            lines = lines[1:]
+
+        for line in lines:
+            if _TABLE_ROW.match(line):
+                continue
+            bold.extend(match.strip() for match in _BOLD.findall(line))
+            text = _BOLD.sub(r"\1", _LIST_ITEM.sub("", line)).strip()
+            sentence = _FIRST_SENTENCE.match(text)
+            leads.append(sentence.group(1) if sentence else text)
+            if not _LIST_ITEM.match(line):
+                # Only the lead sentence of a paragraph
+                break
+
+    claims = []
+    for claim in bold + leads:
+        if claim and not any(claim in kept for kept in claims):
+            claims.append(claim)
+    return headings, claims
+
+
+def summarize_section(section: Section, token_budget: int) -> str:
+    """Returns a summary of the section, with its headings and key claims, within the token budget."""
+    headings, claims = _key_claims(section.content or "")
+
+    summary = f"{section.name}: {section.description}\n"
+    if headings:
+        summary += f"Headings: {'; '.join(headings)}\n"
+
+    remaining = token_budget - estimate_tokens(summary)
+    for claim in claims:
+        line = f"- {claim}\n"
+        if estimate_tokens(line) > remaining:
+            break
+        summary += line
+        remaining -= estimate_tokens(line)
+
+    if estimate_tokens(summary) > token_budget:
+        return truncate_to_tokens(summary, token_budget)
+    return summary.strip()
+
+
+def build_research_digest(sections: List[Section], section_tokens: int) -> str:
+    """
+    Builds a compact digest of the researched sections, bounded to section_tokens per section,
+    for the writers of the sections that synthesize the article (introduction, conclusion).
+    """
+    return "\n\n".join(
+        f"Section {idx}: {summarize_section(section, section_tokens)}"
+        for idx, section in enumerate(sections, 1)
+    )
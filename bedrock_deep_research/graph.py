@@ -4,7 +4,8 @@ from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph
 from langgraph.types import Command
 
-from .config import Configuration
+from .bedrock_clients import get_bedrock_clients
+from .config import DEFAULT_ROUTES, Configuration
 from .model import (ArticleInputState, ArticleOutputState, ArticleState,
                     SectionOutputState, SectionState)
 from .nodes import (ArticleHeadImageGenerator, ArticleOutlineGenerator,
@@ -13,16 +14,105 @@ from .nodes import (ArticleHeadImageGenerator, ArticleOutlineGenerator,
                     InitialResearcher, SectionSearchQueryGenerator,
                     SectionWebResearcher, SectionWriter,
                     initiate_final_section_writing)
-from .web_search import WebSearch
+from .limiters import get_adaptive_limit, get_concurrency_stats, get_rate_limiter
+from .llm import route_stats
+from .llm_cache import LLMResponseCache
+from .metrics import NodeMetrics
+from .page_store import PageStore
+from .prompt_cache import prompt_cache_stats
+from .retrieval import RunCorpora
+from .retry import get_retry_stats
+from .search_backends import SearchBackend, TavilySearchBackend
+from .streaming import to_token_chunk
+from .utils import get_event_loop_thread
+from .web_search import SearchCache, WebSearch
 
 logger = logging.getLogger(__name__)
 
 
 class BedrockDeepResearch:
-    def __init__(self, config: dict, tavily_api_key: str):
+    def __init__(
+        self,
+        config: dict,
+        tavily_api_key: str | None = None,
+        search_backend: SearchBackend | None = None,
+    ):
+        """
+        Args:
+            config: RunnableConfig of the workflow
+            tavily_api_key: Tavily API key, used when no search_backend is given
+            search_backend: Search provider, e.g. a ReplaySearchBackend to run offline
+        """
+        if search_backend is None:
+            if not tavily_api_key:
+                raise ValueError(
+                    "Either tavily_api_key or search_backend must be provided")
+            search_backend = TavilySearchBackend(tavily_api_key)
+
         self.config = config
-        self.web_search = WebSearch(tavily_api_key, save_search_results=False)
+        configurable = Configuration.from_runnable_config(config)
+        search_cache = (
+            SearchCache(
+                cache_dir=configurable.search_cache_dir,
+                ttl_seconds=configurable.search_cache_ttl,
+                max_entries=configurable.search_cache_max_entries,
+            )
+            if configurable.search_cache_enabled
+            else None
+        )
+        # Size the connection pools of the shared Bedrock clients before any node runs
+        get_bedrock_clients(configurable.bedrock_max_pool_connections)
+        model_ids = {configurable.route(name).model_id for name in DEFAULT_ROUTES}
+        for model_id in model_ids | {configurable.image_model}:
+            get_adaptive_limit(
+                model_id, configurable.llm_min_concurrency, configurable.llm_max_concurrency)
+        self.page_store = PageStore(configurable.page_store_dir)
+        self.llm_cache = (
+            LLMResponseCache(
+                path=configurable.llm_cache_path,
+                ttl_seconds=configurable.llm_cache_ttl,
+                max_entries=configurable.llm_cache_max_entries,
+            )
+            if configurable.llm_cache_enabled
+            else None
+        )
+        rate_limiter = get_rate_limiter(
+            search_backend.name,
+            rate=configurable.search_requests_per_second,
+            burst=configurable.search_burst,
+            max_in_flight=configurable.search_max_concurrency,
+        )
+        self.web_search = WebSearch(
+            search_backend,
+            save_search_results=False,
+            cache=search_cache,
+            rate_limiter=rate_limiter,
+            timeout=configurable.search_timeout,
+            hedge_percentile=configurable.search_hedge_percentile or None,
+            include_raw_content=configurable.search_include_raw_content,
+            page_store=self.page_store,
+        )
+        # Sources fetched during each run, shared by its initial research and all its sections
+        self.source_corpora = (
+            RunCorpora(
+                min_results=configurable.corpus_min_results,
+                min_term_coverage=configurable.corpus_min_term_coverage,
+                max_results=WebSearch.MAX_RESULTS,
+            )
+            if configurable.use_source_corpus
+            else None
+        )
+        # Wall time, tokens, retries and searches of each node invocation, by run
+        self.metrics = NodeMetrics()
         self.graph = self.__create_workflow()
+        # A single process-wide loop serves every call so the async search client stays warm,
+        # and instances dropped without close() leave no thread behind
+        self._event_loop = get_event_loop_thread()
+
+    def _instrument(self, node):
+        """Wraps the node so that its invocations are recorded in the run metrics."""
+
+        return self.metrics.instrument(node.N, node)
 
     def __create_workflow(self):
 
@@ -32,12 +122,15 @@ class BedrockDeepResearch:
             section_builder = StateGraph(
                 SectionState, output=SectionOutputState)
             section_builder.add_node(
-                SectionSearchQueryGenerator.N, SectionSearchQueryGenerator()
+                SectionSearchQueryGenerator.N, self._instrument(
+                    SectionSearchQueryGenerator(self.llm_cache))
             )
             section_builder.add_node(
-                SectionWebResearcher.N, SectionWebResearcher(self.web_search)
+                SectionWebResearcher.N, self._instrument(
+                    SectionWebResearcher(self.web_search, self.source_corpora))
             )
-            section_builder.add_node(SectionWriter.N, SectionWriter())
+            section_builder.add_node(
+                SectionWriter.N, self._instrument(SectionWriter(self.llm_cache)))
 
             # Subgraph: Add edges
             section_builder.add_edge(START, SectionSearchQueryGenerator.N)
@@ -54,17 +147,21 @@ class BedrockDeepResearch:
             config_schema=Configuration,
         )
         builder.add_node(InitialResearcher.N,
-                         InitialResearcher(self.web_search))
-        builder.add_node(ArticleOutlineGenerator.N, ArticleOutlineGenerator())
+                         self._instrument(InitialResearcher(self.web_search, self.source_corpora, self.llm_cache)))
+        builder.add_node(ArticleOutlineGenerator.N,
+                         self._instrument(ArticleOutlineGenerator(self.llm_cache)))
+        # Not instrumented, its wall time is the time taken by the human to answer
         builder.add_node(HumanFeedbackProvider.N, HumanFeedbackProvider())
         builder.add_node("build_section_with_web_research",
                          _section_subgraph())
         builder.add_node(CompletedSectionsFormatter.N,
-                         CompletedSectionsFormatter())
-        builder.add_node(FinalSectionsWriter.N, FinalSectionsWriter())
+                         self._instrument(CompletedSectionsFormatter(self.page_store)))
+        builder.add_node(FinalSectionsWriter.N,
+                         self._instrument(FinalSectionsWriter(self.page_store, self.llm_cache)))
         builder.add_node(ArticleHeadImageGenerator.N,
-                         ArticleHeadImageGenerator())
-        builder.add_node(CompileFinalArticle.N, CompileFinalArticle())
+                         self._instrument(ArticleHeadImageGenerator()))
+        builder.add_node(CompileFinalArticle.N,
+                         self._instrument(CompileFinalArticle()))
 
         # Add edges
         builder.add_edge(START, InitialResearcher.N)
@@ -86,25 +183,175 @@ class BedrockDeepResearch:
 
         return builder.compile(checkpointer=memory)
 
-    def start(self, topic: str):
+    def _run_config(self, thread_id: str | None = None) -> dict:
+        """Returns the config of the workflow, for the given thread instead of the default one if set."""
+
+        if thread_id is None:
+            return self.config
+        return {
+            **self.config,
+            "configurable": {**self.config.get("configurable", {}), "thread_id": thread_id},
+        }
+
+    def _thread_id(self, thread_id: str | None = None) -> str:
+        return str(self._run_config(thread_id).get("configurable", {}).get("thread_id"))
+
+    async def _end_run_if_finished(self, config: dict) -> None:
+        """Drops the source corpus of the run once the workflow has reached its end."""
+
+        if self.source_corpora is None:
+            return
+        state = await self.graph.aget_state(config)
+        if not state.next:
+            self.source_corpora.drop(config.get("configurable", {}).get("thread_id"))
+
+    def start(self, topic: str, thread_id: str | None = None):
         """Starts the workflow with the given topic."""
 
+        return self._event_loop.run(self.astart(topic, thread_id))
+
+    def feedback(self, feedback, thread_id: str | None = None):
+        """Provides feedback to the workflow."""
+
+        return self._event_loop.run(self.afeedback(feedback, thread_id))
+
+    async def astart(self, topic: str, thread_id: str | None = None):
+        """
+        Starts the workflow with the given topic.
+
+        Args:
+            topic: Topic of the article
+            thread_id: Thread of the run, to run several articles on the same graph.
+                Defaults to the thread_id of the config
+        """
+
         logger.debug(f"Starting workflow with topic: {topic}")
 
-        return self.graph.invoke(
-            {"topic": topic}, self.config, stream_mode="updates"
-        )
+        config = self._run_config(thread_id)
+        try:
+            return await self.graph.ainvoke(
+                {"topic": topic}, config, stream_mode="updates"
+            )
+        finally:
+            await self._end_run_if_finished(config)
 
-    def feedback(self, feedback):
+    async def afeedback(self, feedback, thread_id: str | None = None):
         """Provides feedback to the workflow."""
 
         logger.info(f"Feedback received: {feedback}")
 
-        return self.graph.invoke(
-            Command(resume=feedback), self.config, stream_mode="updates"
-        )
+        config = self._run_config(thread_id)
+        try:
+            return await self.graph.ainvoke(
+                Command(resume=feedback), config, stream_mode="updates"
+            )
+        finally:
+            await self._end_run_if_finished(config)
+
+    async def astream(self, topic: str, thread_id: str | None = None):
+        """Streams the workflow updates for the given topic."""
+
+        logger.debug(f"Streaming workflow with topic: {topic}")
+
+        config = self._run_config(thread_id)
+        try:
+            async for update in self.graph.astream(
+                {"topic": topic}, config, stream_mode="updates"
+            ):
+                yield update
+        finally:
+            await self._end_run_if_finished(config)
+
+    async def astream_tokens(self, topic: str | None = None, feedback=None, thread_id: str | None = None):
+        """
+        Starts the workflow with the topic, or resumes it with the feedback, and yields
+        the tokens of the section writers as TokenChunks, as soon as they are generated.
+        """
+
+        if (topic is None) == (feedback is None):
+            raise ValueError("Exactly one of topic or feedback must be provided")
+        graph_input = {"topic": topic} if topic is not None else Command(
+            resume=feedback)
+
+        config = self._run_config(thread_id)
+        try:
+            async for _, (message, metadata) in self.graph.astream(
+                graph_input, config, stream_mode="messages", subgraphs=True
+            ):
+                chunk = to_token_chunk(message, metadata)
+                if chunk is not None:
+                    yield chunk
+        finally:
+            await self._end_run_if_finished(config)
+
+    def stream_tokens(self, topic: str | None = None, feedback=None, thread_id: str | None = None):
+        """Synchronous counterpart of astream_tokens."""
+
+        tokens = self.astream_tokens(topic, feedback, thread_id)
+        try:
+            while True:
+                try:
+                    yield self._event_loop.run(anext(tokens))
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._event_loop.run(tokens.aclose())
+
+    def get_search_stats(self, thread_id: str | None = None):
+        """
+        Returns the web search counters and the share of queries answered by the corpus of
+        the run, or by the corpora of all the runs when no thread_id is given.
+        """
+
+        return {
+            **self.web_search.get_stats(),
+            "corpus": self.source_corpora.stats(thread_id) if self.source_corpora is not None else None,
+        }
+
+    def get_prompt_cache_stats(self):
+        """Returns the input tokens read from and written to the Bedrock prompt cache."""
+
+        return prompt_cache_stats.get_stats()
 
-    def get_state(self):
+    def get_llm_stats(self):
+        """Returns the retry counters and the adaptive concurrency limit of each model, and the response cache hits."""
+
+        return {
+            "retries": get_retry_stats(),
+            "concurrency": get_concurrency_stats(),
+            "cache": self.llm_cache.stats() if self.llm_cache else None,
+        }
+
+    def get_route_stats(self):
+        """Returns the calls, latency, tokens and estimated cost of each model route."""
+
+        return route_stats.get_stats()
+
+    def get_metrics(self, thread_id: str | None = None):
+        """
+        Returns the wall time, model calls, tokens, retries and web searches of each node
+        invocation of the run, with their totals by node, by section and by search iteration.
+        """
+
+        return self.metrics.get_metrics(self._thread_id(thread_id))
+
+    def export_metrics(self, path: str, thread_id: str | None = None):
+        """Writes the metrics of the run to a JSON file and returns its path."""
+
+        return self.metrics.export_json(path, self._thread_id(thread_id))
+
+    def get_state(self, thread_id: str | None = None):
+        """Returns the current state of the workflow."""
+
+        return self.graph.get_state(self._run_config(thread_id))
+
+    async def aget_state(self, thread_id: str | None = None):
         """Returns the current state of the workflow."""
 
-        return self.graph.get_state(self.config)
+        return await self.graph.aget_state(self._run_config(thread_id))
+
+    def close(self):
+        """Closes the LLM response cache. The shared event loop keeps serving the other instances."""
+
+        if self.llm_cache:
+            self.llm_cache.close()
@@ -0,0 +1,331 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimit:
+    """
+    A semaphore with an adjustable limit that can be shared by several event loops.
+
+    asyncio.Semaphore is bound to a single loop, this limit keeps its state behind a
+    thread lock and wakes each waiter on its own loop, so it can be shared process-wide.
+
+    Attributes:
+        limit (int): Maximum number of holders at the same time
+        in_flight (int): Current number of holders
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+        self.in_flight = 0
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = (
+            deque()
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        with self._lock:
+            if self.in_flight < self.limit and not self._waiters:
+                self.in_flight += 1
+                return
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was handed over before the cancellation, give it back
+            if waiter[1].done() and not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            if self.in_flight <= self.limit and self._waiters:
+                # Hand the slot over to the next waiter, in_flight is unchanged
+                loop, future = self._waiters.popleft()
+                loop.call_soon_threadsafe(self._wake, future)
+            else:
+                self.in_flight -= 1
+
+    def set_limit(self, limit: int) -> None:
+        """Changes the limit, waking as many waiters as the new limit allows."""
+        with self._lock:
+            self.limit = max(1, limit)
+            while self.in_flight < self.limit and self._waiters:
+                loop, future = self._waiters.popleft()
+                self.in_flight += 1
+                loop.call_soon_threadsafe(self._wake, future)
+
+    def _wake(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket refilled at a constant rate.
+
+    Attributes:
+        rate (float): Tokens added per second, 0 or less disables the bucket
+        capacity (float): Maximum number of tokens, i.e. the allowed burst
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, rate: float, capacity: float) -> None:
+        with self._lock:
+            self.rate = rate
+            self.capacity = max(1.0, capacity)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def reserve(self) -> float:
+        """Takes one token and returns how many seconds to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens +
+                (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Limits calls to an external service with a token bucket and a max-in-flight cap.
+
+    Use it as an async context manager around each request. Time spent waiting for a
+    slot and a token is recorded to help sizing the limits.
+
+    Attributes:
+        name (str): Name of the limited service
+        bucket (TokenBucket): Request rate limit
+        slots (ConcurrencyLimit): Maximum number of requests in flight
+    """
+
+    WAIT_SAMPLES = 1000
+
+    def __init__(self, name: str, rate: float, burst: int, max_in_flight: int):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = ConcurrencyLimit(max_in_flight)
+        self._wait_times: deque[float] = deque(maxlen=self.WAIT_SAMPLES)
+        self._total_wait = 0.0
+        self._acquired = 0
+        self._lock = threading.Lock()
+
+    def configure(self, rate: float, burst: int, max_in_flight: int) -> None:
+        """Updates the limits in place, keeping the waiters and the counters."""
+        self.bucket.update(rate, burst)
+        self.slots.set_limit(max_in_flight)
+
+    async def __aenter__(self):
+        start = time.monotonic()
+        await self.slots.acquire()
+        try:
+            delay = self.bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            self.slots.release()
+            raise
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._wait_times.append(waited)
+            self._total_wait += waited
+            self._acquired += 1
+        if waited > 1:
+            logger.debug(f"{self.name} request queued for {waited:.2f}s")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the queue-wait metrics, percentiles cover the most recent requests."""
+        with self._lock:
+            samples = sorted(self._wait_times)
+            acquired = self._acquired
+            total_wait = self._total_wait
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+        return {
+            "requests": acquired,
+            "in_flight": self.slots.in_flight,
+            "queue_depth": self.slots.queue_depth,
+            "wait_seconds_total": total_wait,
+            "wait_seconds_mean": total_wait / acquired if acquired else 0.0,
+            "wait_seconds_p50": percentile(0.5),
+            "wait_seconds_p95": percentile(0.95),
+            "wait_seconds_max": samples[-1] if samples else 0.0,
+        }
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, burst: int, max_in_flight: int) -> RateLimiter:
+    """
+    Returns the process-wide rate limiter for a service, creating it on first use.
+    Later calls update the limits of the existing limiter.
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(name)
+        if limiter is None:
+            limiter = RateLimiter(name, rate, burst, max_in_flight)
+            _rate_limiters[name] = limiter
+        else:
+            limiter.configure(rate, burst, max_in_flight)
+        return limiter
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    Limits the calls in flight to a model with additive increase, multiplicative decrease.
+
+    Each successful call raises the limit by about `increase` per window of `limit` calls,
+    each throttled call cuts it by `decrease_factor`. Throttles of calls started before
+    the last cut are ignored, so one burst of throttling only cuts the limit once.
+
+    Attributes:
+        name (str): Name of the limited model
+        min_limit (int): Lowest allowed limit
+        max_limit (int): Highest allowed limit
+        increase (float): Limit added per window of successful calls
+        decrease_factor (float): Factor applied to the limit on throttling
+        slots (ConcurrencyLimit): Calls in flight
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self._estimate = float(min(max(initial_limit, min_limit), self.max_limit))
+        self.slots = ConcurrencyLimit(int(self._estimate))
+        self._epoch = 0
+        self._stats = {"successes": 0, "throttles": 0, "decreases": 0}
+        self._lock = threading.Lock()
+
+    def configure(self, min_limit: int, max_limit: int) -> None:
+        """Updates the bounds of the limit in place."""
+        with self._lock:
+            self.min_limit = min_limit
+            self.max_limit = max(min_limit, max_limit)
+            self._estimate = min(max(self._estimate, self.min_limit), self.max_limit)
+        self._apply()
+
+    async def acquire(self) -> int:
+        """Waits for a slot and returns the epoch to report the outcome of the call with."""
+        await self.slots.acquire()
+        with self._lock:
+            return self._epoch
+
+    def release(self) -> None:
+        self.slots.release()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._stats["successes"] += 1
+            self._estimate = min(
+                self.max_limit, self._estimate + self.increase / self._estimate)
+        self._apply()
+
+    def record_throttle(self, epoch: int) -> None:
+        with self._lock:
+            self._stats["throttles"] += 1
+            if epoch != self._epoch:
+                return
+            self._epoch += 1
+            self._stats["decreases"] += 1
+            self._estimate = max(
+                self.min_limit, self._estimate * self.decrease_factor)
+            logger.info(
+                f"{self.name} throttled, concurrency limit lowered to {int(self._estimate)}")
+        self._apply()
+
+    def _apply(self) -> None:
+        with self._lock:
+            limit = int(self._estimate)
+        if limit != self.slots.limit:
+            self.slots.set_limit(limit)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            **stats,
+            "limit": self.slots.limit,
+            "in_flight": self.slots.in_flight,
+            "queue_depth": self.slots.queue_depth,
+        }
+
+
+_adaptive_limits: Dict[str, AdaptiveConcurrencyLimit] = {}
+_adaptive_limits_lock = threading.Lock()
+
+
+def get_adaptive_limit(
+    name: str, min_limit: Optional[int] = None, max_limit: Optional[int] = None
+) -> AdaptiveConcurrencyLimit:
+    """
+    Returns the process-wide adaptive concurrency limit of a model, creating it on first use.
+    Bounds given on later calls update the existing limit.
+    """
+    with _adaptive_limits_lock:
+        limit = _adaptive_limits.get(name)
+        if limit is None:
+            limit = AdaptiveConcurrencyLimit(name)
+            _adaptive_limits[name] = limit
+    if min_limit is not None and max_limit is not None:
+        limit.configure(min_limit, max_limit)
+    return limit
+
+
+def get_concurrency_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns the current limit, calls in flight and queue depth of every model."""
+    with _adaptive_limits_lock:
+        limits = dict(_adaptive_limits)
+    return {name: limit.stats() for name, limit in limits.items()}
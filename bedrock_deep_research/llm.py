@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional
+
+from langchain_aws import ChatBedrock
+from langchain_core.messages import AIMessage, BaseMessage
+from pydantic import BaseModel
+
+from .bedrock_clients import get_bedrock_clients
+from .config import get_model_settings
+from .llm_cache import LLMResponseCache
+from .metrics import record_model_call
+from .prompt_cache import cache_token_usage, prompt_cache_stats
+from .retry import get_retry_engine
+from .streaming import content_text
+
+logger = logging.getLogger(__name__)
+
+
+class RouteStats:
+    """Process-wide latency, token usage and cost of the model calls of each route."""
+
+    LATENCY_SAMPLES = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, Any]] = defaultdict(
+            lambda: {"calls": 0, "cache_hits": 0, "input_tokens": 0,
+                     "output_tokens": 0, "cost_usd": 0.0, "latency_seconds_total": 0.0,
+                     "models": set()})
+        self._latencies: Dict[str, deque] = defaultdict(
+            lambda: deque(maxlen=self.LATENCY_SAMPLES))
+
+    def record(self, route: str, model_id: str, message: Optional[AIMessage], latency: float) -> None:
+        usage = (getattr(message, "usage_metadata", None) or {})
+        input_tokens = usage.get("input_tokens") or 0
+        output_tokens = usage.get("output_tokens") or 0
+        settings = get_model_settings(model_id)
+        cost = (input_tokens * settings.input_price +
+                output_tokens * settings.output_price) / 1_000_000
+        with self._lock:
+            stats = self._routes[route]
+            stats["calls"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["cost_usd"] += cost
+            stats["latency_seconds_total"] += latency
+            stats["models"].add(model_id)
+            self._latencies[route].append(latency)
+
+    def record_cache_hit(self, route: str) -> None:
+        with self._lock:
+            self._routes[route]["cache_hits"] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            routes = {name: {**stats, "models": sorted(stats["models"])}
+                      for name, stats in self._routes.items()}
+            latencies = {name: sorted(samples)
+                         for name, samples in self._latencies.items()}
+
+        for name, stats in routes.items():
+            samples = latencies.get(name, [])
+            stats["latency_seconds_mean"] = (
+                stats["latency_seconds_total"] / stats["calls"] if stats["calls"] else 0.0)
+            stats["latency_seconds_p95"] = (
+                samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0)
+        return routes
+
+
+route_stats = RouteStats()
+
+
+async def ainvoke_model(
+    model: ChatBedrock,
+    messages: List[BaseMessage],
+    schema: Optional[type[BaseModel]] = None,
+    cache: Optional[LLMResponseCache] = None,
+    max_retries: int = 10,
+    metadata: Optional[Dict[str, Any]] = None,
+    route: Optional[str] = None,
+):
+    """
+    Calls the model through its shared retry engine, and through the response cache when given.
+    The blocking call runs on the executor of the Bedrock client registry, and the
+    response cache reads and writes run in a worker thread.
+
+    Args:
+        model: Chat model to call
+        messages: Messages of the call
+        schema: Pydantic model of the structured output, None for a text response
+        cache: Response cache, None to always call the model
+        max_retries: Maximum number of retry attempts
+        metadata: Added to the metadata of the call, and so to the chunks streamed from it
+        route: Call site the latency, tokens and cost of the call are reported under
+
+    Returns:
+        AIMessage | BaseModel: The response message, or the parsed schema instance
+    """
+    key = None
+    if cache is not None:
+        key = cache.make_key(
+            model.model_id,
+            messages,
+            schema,
+            max_tokens=getattr(model, "max_tokens", None),
+            temperature=getattr(model, "temperature", None),
+        )
+        # SQLite reads and writes run in a worker thread, off the event loop
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            logger.debug(f"LLM cache hit for {model.model_id}")
+            if route:
+                route_stats.record_cache_hit(route)
+            record_model_call(model.model_id, cache_hit=True)
+            if schema is not None:
+                return schema.model_validate(cached["parsed"])
+            return AIMessage(content=cached["content"], response_metadata={"cache_hit": True})
+
+    engine = get_retry_engine(model.model_id)
+    start = time.monotonic()
+    if schema is not None:
+        response, raw = await engine.acall(
+            _ainvoke_structured, model, messages, schema, metadata, max_retries=max_retries)
+        value = {"parsed": response.model_dump(mode="json")}
+    else:
+        runnable = model.with_config(metadata=metadata) if metadata else model
+        response = raw = await engine.acall(
+            get_bedrock_clients().arun, runnable.invoke, messages, max_retries=max_retries)
+        # Streamed Converse responses are a list of content blocks
+        response.content = content_text(response.content)
+        value = {"content": response.content}
+
+    latency = time.monotonic() - start
+    prompt_cache_stats.record(raw)
+    if route:
+        route_stats.record(route, model.model_id, raw, latency)
+    usage = getattr(raw, "usage_metadata", None) or {}
+    record_model_call(
+        model.model_id,
+        input_tokens=usage.get("input_tokens") or 0,
+        output_tokens=usage.get("output_tokens") or 0,
+        cache_read_tokens=cache_token_usage(raw)[0],
+        latency=latency,
+    )
+    if key is not None:
+        await asyncio.to_thread(cache.set, key, value)
+    return response
+
+
+async def _ainvoke_structured(
+    model: ChatBedrock, messages: List[BaseMessage], schema: type[BaseModel], metadata: Optional[Dict[str, Any]]
+):
+    """Returns the parsed response and the raw response message."""
+    runnable = model.with_structured_output(schema, include_raw=True)
+    if metadata:
+        runnable = runnable.with_config(metadata=metadata)
+    response = await get_bedrock_clients().arun(runnable.invoke, messages)
+    if response["parsing_error"] is not None:
+        raise response["parsing_error"]
+    return response["parsed"], response["raw"]
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """
+    An SQLite cache of model responses, keyed by the model, its parameters, the
+    messages and the structured-output schema of the call.
+
+    Entries expire after ttl_seconds. Beyond max_entries, the least recently used
+    entries are evicted.
+
+    Attributes:
+        path (Path): SQLite database file
+        ttl_seconds (int): Seconds an entry stays valid
+        max_entries (int): Maximum number of entries kept
+    """
+
+    def __init__(self, path: str = "llm_cache.sqlite", ttl_seconds: int = 604800, max_entries: int = 10000):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(
+            str(self.path), check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._purge_expired()
+
+    @staticmethod
+    def make_key(
+        model_id: str,
+        messages: List[BaseMessage],
+        schema: Optional[type[BaseModel]] = None,
+        **params: Any,
+    ) -> str:
+        """Returns the key of a call: a hash of the model, its parameters, the messages and the schema."""
+        payload = {
+            "model_id": model_id,
+            "params": params,
+            "messages": [{"type": m.type, "content": m.content} for m in messages],
+            "schema": schema.model_json_schema() if schema else None,
+        }
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self._misses += 1
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self._hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._connection.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._connection.execute(
+                "SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {"entries": entries, "hits": self._hits, "misses": self._misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _purge_expired(self) -> None:
+        with self._lock:
+            deleted = self._connection.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() -
+                                                              self.ttl_seconds,)
+            ).rowcount
+            self._connection.commit()
+        if deleted:
+            logger.debug(f"Purged {deleted} expired LLM responses")
@@ -0,0 +1,238 @@
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Span of the node invocation running in the current task, None outside of the nodes
+_current_span: contextvars.ContextVar[Optional["NodeSpan"]] = contextvars.ContextVar(
+    "node_span", default=None)
+
+
+@dataclass
+class NodeSpan:
+    """
+    Wall time and resource usage of one node invocation.
+
+    Attributes:
+        node (str): Name of the graph node
+        section (str | None): Name of the section the node works on, None for the article nodes
+        iteration (int | None): Search iterations of the section done when the node started
+        started_at (float): Start time, in seconds since the epoch
+        wall_seconds (float): Duration of the invocation
+        model_calls (int): Model calls made, including the ones answered by the response cache
+        cache_hits (int): Model calls answered by the response cache
+        input_tokens (int): Input tokens of the model calls
+        output_tokens (int): Output tokens of the model calls
+        cache_read_tokens (int): Input tokens read from the Bedrock prompt cache
+        model_seconds (float): Time spent in model calls, retries included
+        retries (int): Retried model calls
+        model_ids (list[str]): Models called
+        searches (int): Web search calls
+        search_queries (int): Queries of the web search calls
+        search_seconds (float): Time spent in web search calls
+        error (str | None): Type of the exception raised by the node, if any
+    """
+
+    node: str
+    section: Optional[str] = None
+    iteration: Optional[int] = None
+    started_at: float = 0.0
+    wall_seconds: float = 0.0
+    model_calls: int = 0
+    cache_hits: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    model_seconds: float = 0.0
+    retries: int = 0
+    model_ids: List[str] = field(default_factory=list)
+    searches: int = 0
+    search_queries: int = 0
+    search_seconds: float = 0.0
+    error: Optional[str] = None
+
+    def __post_init__(self):
+        # Model calls of a node may run in worker threads
+        self._lock = threading.Lock()
+
+    def add_model_call(
+        self, model_id: str, input_tokens: int, output_tokens: int, cache_read_tokens: int,
+        latency: float, cache_hit: bool,
+    ) -> None:
+        with self._lock:
+            self.model_calls += 1
+            self.cache_hits += int(cache_hit)
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.cache_read_tokens += cache_read_tokens
+            self.model_seconds += latency
+            if model_id not in self.model_ids:
+                self.model_ids.append(model_id)
+
+    def add_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def add_search(self, queries: int, latency: float) -> None:
+        with self._lock:
+            self.searches += 1
+            self.search_queries += queries
+            self.search_seconds += latency
+
+
+def record_model_call(
+    model_id: str,
+    input_tokens: int = 0,
+    output_tokens: int = 0,
+    cache_read_tokens: int = 0,
+    latency: float = 0.0,
+    cache_hit: bool = False,
+) -> None:
+    """Adds a model call to the span of the running node, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.add_model_call(model_id, input_tokens, output_tokens,
+                            cache_read_tokens, latency, cache_hit)
+
+
+def record_retry() -> None:
+    """Adds a retried model call to the span of the running node, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.add_retry()
+
+
+def record_search(queries: int, latency: float) -> None:
+    """Adds a web search call to the span of the running node, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.add_search(queries, latency)
+
+
+# Fields summed when aggregating spans
+_TOTALS = ("wall_seconds", "model_calls", "cache_hits", "input_tokens", "output_tokens",
+           "cache_read_tokens", "model_seconds", "retries", "searches", "search_queries",
+           "search_seconds")
+
+
+def _aggregate(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    totals = {name: 0 for name in _TOTALS}
+    model_ids = set()
+    for span in spans:
+        for name in _TOTALS:
+            totals[name] += span[name]
+        model_ids.update(span["model_ids"])
+    return {"invocations": len(spans), **totals, "model_ids": sorted(model_ids),
+            "errors": sum(1 for span in spans if span["error"])}
+
+
+class NodeMetrics:
+    """
+    Records a span for every node invocation of each run (graph thread), with the model
+    calls, retries and web searches made while the node runs.
+
+    Attributes:
+        max_threads (int): Runs kept, the oldest are dropped beyond it
+    """
+
+    def __init__(self, max_threads: int = 1000):
+        self.max_threads = max_threads
+        self._spans: OrderedDict[str, List[NodeSpan]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def instrument(self, name: str, node):
+        """
+        Wraps a node so that each of its invocations is recorded, keyed by the thread of
+        the run, the section of the state and its search iteration.
+        """
+        call = node if inspect.isfunction(node) else node.__call__
+
+        def open_span(state, config) -> NodeSpan:
+            section = state.get("section") if isinstance(state, dict) else None
+            span = NodeSpan(
+                node=name,
+                section=getattr(section, "name", None),
+                iteration=state.get("search_iterations") if isinstance(
+                    state, dict) else None,
+                started_at=time.time(),
+            )
+            thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+            self._add(str(thread_id), span)
+            return span
+
+        if inspect.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def async_wrapper(state, config):
+                span = open_span(state, config)
+                token = _current_span.set(span)
+                start = time.monotonic()
+                try:
+                    return await call(state, config)
+                except BaseException as e:
+                    span.error = type(e).__name__
+                    raise
+                finally:
+                    span.wall_seconds = time.monotonic() - start
+                    _current_span.reset(token)
+            return async_wrapper
+
+        @functools.wraps(call)
+        def wrapper(state, config):
+            span = open_span(state, config)
+            token = _current_span.set(span)
+            start = time.monotonic()
+            try:
+                return call(state, config)
+            except BaseException as e:
+                span.error = type(e).__name__
+                raise
+            finally:
+                span.wall_seconds = time.monotonic() - start
+                _current_span.reset(token)
+        return wrapper
+
+    def _add(self, thread_id: str, span: NodeSpan) -> None:
+        with self._lock:
+            self._spans.setdefault(thread_id, []).append(span)
+            self._spans.move_to_end(thread_id)
+            while len(self._spans) > self.max_threads:
+                self._spans.popitem(last=False)
+
+    def get_metrics(self, thread_id: str) -> Dict[str, Any]:
+        """
+        Returns the spans of the run, and their totals by node, by section and by
+        section and search iteration.
+        """
+        with self._lock:
+            spans = [asdict(span) for span in self._spans.get(str(thread_id), [])]
+
+        by_node, by_section, by_iteration = defaultdict(
+            list), defaultdict(list), defaultdict(list)
+        for span in spans:
+            by_node[span["node"]].append(span)
+            if span["section"] is not None:
+                by_section[span["section"]].append(span)
+                by_iteration[f"{span['section']}#{span['iteration']}"].append(span)
+
+        return {
+            "thread_id": thread_id,
+            "totals": _aggregate(spans),
+            "by_node": {name: _aggregate(group) for name, group in by_node.items()},
+            "by_section": {name: _aggregate(group) for name, group in by_section.items()},
+            "by_section_iteration": {name: _aggregate(group) for name, group in by_iteration.items()},
+            "spans": spans,
+        }
+
+    def export_json(self, path: str, thread_id: str) -> Path:
+        """Writes the metrics of the run to a JSON file and returns its path."""
+        output_path = Path(path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(json.dumps(
+            self.get_metrics(thread_id), indent=2), encoding="utf-8")
+        return output_path
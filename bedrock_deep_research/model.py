@@ -3,6 +3,8 @@ from typing import Annotated, List, TypedDict
 
 from pydantic import BaseModel, Field
 
+from .utils import canonicalize_url
+
 
 class SearchQuery(BaseModel):
     search_query: str = Field(None, description="Query for web search.")
@@ -59,13 +61,35 @@ class Outline(BaseModel):
     )
 
 
+def merge_sources(existing: list, new: list) -> list:
+    """Reducer appending the sources whose canonical URL is not already in the list."""
+    existing = existing or []
+    seen = {canonicalize_url(source.url) for source in existing}
+    merged = list(existing)
+    for source in new or []:
+        url = canonicalize_url(source.url)
+        if url not in seen:
+            seen.add(url)
+            merged.append(source)
+    return merged
+
+
+def merge_evidence(existing: dict, new: dict) -> dict:
+    """Reducer merging search results keyed by canonical URL, keeping the first copy of each."""
+    merged = dict(existing or {})
+    for url, result in (new or {}).items():
+        merged.setdefault(url, result)
+    return merged
+
+
 class ArticleState(TypedDict):
     topic: str
     title: str
     sections: list[Section]
     completed_sections: Annotated[list, operator.add]
-    # String of any completed sections from research to write final sections
-    report_sections_from_research: str
+    # Digest of the completed sections from research to write final sections
+    research_digest: str
+    report_sections_ref: str  # Page store hash of the full completed sections
     source_str: str  # String of formatted source content from web search
 
     feedback_on_report_plan: str
@@ -85,11 +109,15 @@ class SectionState(TypedDict):
     section: Section  # Report section
     search_iterations: int  # Number of search iterations done
     search_queries: list[SearchQuery]  # List of search queries
-    sources: Annotated[list, operator.add]
+    query_history: Annotated[list, operator.add]  # Queries already executed
+    sources: Annotated[list, merge_sources]  # Sources of the section, one per canonical URL
+    # Search results found for the section, by canonical URL, without their raw content
+    evidence: Annotated[dict, merge_evidence]
     source_str: str  # String of formatted source content from web search
     feedback_on_report_plan: str  # Feedback on the report plan
-    # String of any completed sections from research to write final sections
-    report_sections_from_research: str
+    # Digest of the completed sections from research to write final sections
+    research_digest: str
+    report_sections_ref: str  # Page store hash of the full completed sections
     # Final key we duplicate in outer state for Send() API
     completed_sections: list[Section]
 
@@ -1,3 +1,4 @@
+import asyncio
 import base64
 import io
 import json
@@ -5,18 +6,16 @@ import logging
 import time
 from pathlib import Path
 
-import boto3
-from botocore.config import Config
 from botocore.exceptions import ClientError
-from langchain_aws import ChatBedrock
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 from PIL import Image
 
-from bedrock_deep_research.utils import exponential_backoff_retry
-
-from ..config import Configuration
+from ..bedrock_clients import get_bedrock_clients
+from ..config import ROUTE_IMAGE_PROMPT, Configuration
+from ..llm import ainvoke_model
 from ..model import ArticleState
+from ..retry import with_retries
 
 logger = logging.getLogger(__name__)
 
@@ -28,20 +27,23 @@ class ImageError(Exception):
         self.message = message
 
 
-@exponential_backoff_retry(ClientError, max_retries=10)
-def generate_image(model_id, body):
+@with_retries("model_id", max_retries=10)
+async def generate_image(model_id, body):
     """
-    Generate an image using Amazon Nova Canvas model on demand.
+    Generate an image using Amazon Nova Canvas model on demand, within the adaptive
+    concurrency limit of the model.
     Args:
         model_id (str): The model ID to use.
         body (str) : The request body to use.
     Returns:
         image_bytes (bytes): The image generated by the model.
     """
-    bedrock = boto3.client(
-        service_name="bedrock-runtime", config=Config(read_timeout=300)
-    )
+    # The boto3 client is blocking, the call runs on the executor of the client registry
+    clients = get_bedrock_clients()
+    return await clients.arun(_invoke_image_model, clients.get_client(), model_id, body)
+
 
+def _invoke_image_model(bedrock, model_id, body):
     accept = "application/json"
     content_type = "application/json"
     response = bedrock.invoke_model(
@@ -87,7 +89,7 @@ You must only return the prompt string and nothing else.
 class ArticleHeadImageGenerator:
     N = "generate_head_image"
 
-    def __call__(self, state: ArticleState, config: RunnableConfig):
+    async def __call__(self, state: ArticleState, config: RunnableConfig):
         title = state["title"]
         sections = state["completed_sections"]
         # Article ID comprises of first 4 words of the title and a hex timestamp in str format
@@ -99,8 +101,9 @@ class ArticleHeadImageGenerator:
         try:
             configurable = Configuration.from_runnable_config(config)
 
-            planner_model = ChatBedrock(
-                model_id=configurable.planner_model, max_tokens=configurable.max_tokens)
+            route = configurable.route(ROUTE_IMAGE_PROMPT)
+            prompt_model = get_bedrock_clients().get_chat_model(
+                route.model_id, route.max_tokens)
 
             system_prompt = generate_image_prompt.format(
                 title=title, outline="\n".join(f"- {s.name}" for s in sections)
@@ -113,7 +116,7 @@ class ArticleHeadImageGenerator:
                 ),
             ]
 
-            prompt = planner_model.invoke(messages)
+            prompt = await ainvoke_model(prompt_model, messages, route=ROUTE_IMAGE_PROMPT)
 
             logger.info("Generated head image prompt: %s", prompt.content)
 
@@ -131,10 +134,10 @@ class ArticleHeadImageGenerator:
                 }
             )
 
-            image_bytes = generate_image(
+            image_bytes = await generate_image(
                 model_id=configurable.image_model, body=body)
-            image_path = self._save_image(
-                article_id, configurable.output_dir, image_bytes
+            image_path = await asyncio.to_thread(
+                self._save_image, article_id, configurable.output_dir, image_bytes
             )
 
         except ClientError as err:
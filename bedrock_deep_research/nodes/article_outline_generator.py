@@ -1,10 +1,13 @@
 import logging
+from typing import Optional
 
-from langchain_aws import ChatBedrock
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 
-from ..config import Configuration
+from ..bedrock_clients import get_bedrock_clients
+from ..config import ROUTE_OUTLINE, Configuration
+from ..llm import ainvoke_model
+from ..llm_cache import LLMResponseCache
 from ..model import ArticleState, Outline, Section
 
 logger = logging.getLogger(__name__)
@@ -47,7 +50,10 @@ Use this context to plan the sections of the article:
 class ArticleOutlineGenerator:
     N = "generate_article_outline"
 
-    def __call__(self, state: ArticleState, config: RunnableConfig):
+    def __init__(self, llm_cache: Optional[LLMResponseCache] = None):
+        self.llm_cache = llm_cache
+
+    async def __call__(self, state: ArticleState, config: RunnableConfig):
         logging.info("Generating report plan")
 
         topic = state.get("topic", "")
@@ -64,8 +70,9 @@ class ArticleOutlineGenerator:
             context=source_str,
             feedback=feedback,
         )
-        outline = self.generate_outline(
-            configurable.planner_model, configurable.max_tokens, system_prompt, user_prompt)
+        route = configurable.route(ROUTE_OUTLINE)
+        outline = await self.generate_outline(
+            route.model_id, route.max_tokens, system_prompt, user_prompt)
 
         logger.info(f"Generated sections: {outline.sections}")
         sections = [
@@ -78,17 +85,19 @@ class ArticleOutlineGenerator:
         logger.info(f"Sections -> {sections}")
         return {"title": outline.title, "sections": sections}
 
-    def generate_outline(self, model_id: str, max_tokens: int, system_prompt: str, user_prompt: str):
+    async def generate_outline(self, model_id: str, max_tokens: int, system_prompt: str, user_prompt: str):
 
-        planner_model = ChatBedrock(
-            model_id=model_id, max_tokens=max_tokens
-        ).with_structured_output(Outline)
+        planner_model = get_bedrock_clients().get_chat_model(model_id, max_tokens)
 
-        return planner_model.invoke(
+        return await ainvoke_model(
+            planner_model,
             [SystemMessage(content=system_prompt)]
             + [
                 HumanMessage(
                     content=user_prompt
                 )
-            ]
+            ],
+            schema=Outline,
+            cache=self.llm_cache,
+            route=ROUTE_OUTLINE,
         )
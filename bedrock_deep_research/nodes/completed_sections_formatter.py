@@ -2,7 +2,10 @@ import logging
 
 from langchain_core.runnables import RunnableConfig
 
+from ..config import Configuration
+from ..digest import build_research_digest
 from ..model import ArticleState, Section
+from ..page_store import PageStore
 
 logger = logging.getLogger(__name__)
 
@@ -10,14 +13,23 @@ logger = logging.getLogger(__name__)
 class CompletedSectionsFormatter:
     N = "gather_completed_sections"
 
+    def __init__(self, page_store: PageStore):
+        self.page_store = page_store
+
     def __call__(self, state: ArticleState, config: RunnableConfig):
         logger.info("Gathering completed sections")
 
+        configurable = Configuration.from_runnable_config(config)
         completed_sections = state["completed_sections"]
+
+        # The full draft is stored once and passed by reference, the digest goes in the state
         draft = self._format_sections(completed_sections)
+        digest = build_research_digest(
+            completed_sections, configurable.digest_section_tokens)
 
         return {
-            "report_sections_from_research": draft,
+            "research_digest": digest,
+            "report_sections_ref": self.page_store.put(draft),
         }
 
     def _format_sections(self, sections: list[Section]) -> str:
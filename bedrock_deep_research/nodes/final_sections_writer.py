@@ -1,25 +1,23 @@
-from botocore.exceptions import ClientError
+import asyncio
+from typing import Optional
+
 from langchain_aws import ChatBedrock
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 
-from ..config import Configuration
+from ..config import ROUTE_FINAL_SECTIONS, Configuration
+from ..llm import ainvoke_model
+from ..llm_cache import LLMResponseCache
 from ..model import Section, SectionState
-from ..utils import exponential_backoff_retry
+from ..page_store import PageStore
+from ..prompt_cache import (cacheable_system_message, caches_prefix,
+                            create_chat_model)
+from ..streaming import section_metadata
 
+# Static instructions, so that they form a cacheable prompt prefix
 final_section_writer_instructions = """You are an expert technical writer crafting a section that synthesizes information from the rest of the article.
 
-<Section title>
-{section_title}
-</Section title>
-
-<Section description>
-{section_description}
-</Section description>
-
-<Available article content>
-{context}
-</Available article content>
+You are given the section title, the section description and the available article content.
 
 <Task>
 1. Section-Specific Approach:
@@ -64,53 +62,84 @@ For Conclusion/Summary:
 - Do not include word count or any preamble in your response
 </Quality Checks>"""
 
+final_section_writer_inputs = """<Section title>
+{section_title}
+</Section title>
+
+<Section description>
+{section_description}
+</Section description>
+
+<Available article content>
+{context}
+</Available article content>
+
+Generate a section of an article based on the provided sources."""
+
 
 class FinalSectionsWriter:
     N = "write_final_sections"
 
-    def __call__(self, state: SectionState, config: RunnableConfig):
+    def __init__(self, page_store: PageStore, llm_cache: Optional[LLMResponseCache] = None):
+        self.page_store = page_store
+        self.llm_cache = llm_cache
+
+    async def __call__(self, state: SectionState, config: RunnableConfig):
         """Write final sections of the article, which do not require web search and use the completed sections as context"""
 
         section = state["section"]
-        completed_report_sections = state["report_sections_from_research"]
-
         configurable = Configuration.from_runnable_config(config)
 
-        writer_model = ChatBedrock(
-            model_id=configurable.writer_model, streaming=True)
+        completed_report_sections = state["research_digest"]
+        if configurable.final_sections_use_full_draft:
+            completed_report_sections = (
+                await asyncio.to_thread(self.page_store.get, state["report_sections_ref"])
+                or completed_report_sections
+            )
+
+        route = configurable.route(ROUTE_FINAL_SECTIONS)
+        prompt_caching = caches_prefix(
+            final_section_writer_instructions, route.model_id, configurable.prompt_caching_enabled)
+        writer_model = create_chat_model(
+            route.model_id,
+            prompt_caching=prompt_caching,
+            max_tokens=route.max_tokens,
+            streaming=True,
+        )
 
-        section.content = self._generate_final_sections(
+        section.content = await self._generate_final_sections(
             writer_model,
-            final_section_writer_instructions,
+            cacheable_system_message(
+                final_section_writer_instructions, prompt_caching),
             section,
             completed_report_sections,
         )
 
         return {"completed_sections": [section]}
 
-    @exponential_backoff_retry(ClientError, max_retries=10)
-    def _generate_final_sections(
+    async def _generate_final_sections(
         self,
         model: ChatBedrock,
-        system_prompt: str,
+        system_message: SystemMessage,
         section: Section,
         completed_report_sections: str,
     ) -> str:
-        # Format system instructions
-        system_instructions = system_prompt.format(
-            section_title=section.name,
-            section_description=section.description,
-            context=completed_report_sections,
-        )
-
         # Generate section
-        section_content = model.invoke(
-            [SystemMessage(content=system_instructions)]
+        section_content = await ainvoke_model(
+            model,
+            [system_message]
             + [
                 HumanMessage(
-                    content="Generate a section of an article based on the provided sources."
+                    content=final_section_writer_inputs.format(
+                        section_title=section.name,
+                        section_description=section.description,
+                        context=completed_report_sections,
+                    )
                 )
-            ]
+            ],
+            cache=self.llm_cache,
+            metadata=section_metadata(section),
+            route=ROUTE_FINAL_SECTIONS,
         )
 
         return section_content.content
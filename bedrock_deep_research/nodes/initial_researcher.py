@@ -1,15 +1,16 @@
-import asyncio
 import logging
-from typing import List
+from typing import List, Optional
 
-from botocore.exceptions import ClientError
-from langchain_aws import ChatBedrock
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 
-from ..config import Configuration
+from ..bedrock_clients import get_bedrock_clients
+from ..config import ROUTE_OUTLINE, ROUTE_QUERY_GENERATION, Configuration
+from ..context_packer import pack_sources, source_token_budget
+from ..llm import ainvoke_model
+from ..llm_cache import LLMResponseCache
 from ..model import ArticleInputState, Queries
-from ..utils import exponential_backoff_retry, format_web_search
+from ..retrieval import RunCorpora
 from ..web_search import WebSearch
 
 logger = logging.getLogger(__name__)
@@ -32,10 +33,17 @@ Make the queries detailed but specific enough to find high-quality, relevant sou
 class InitialResearcher:
     N = "initial_research"
 
-    def __init__(self, web_search: WebSearch):
+    def __init__(
+        self,
+        web_search: WebSearch,
+        source_corpora: Optional[RunCorpora] = None,
+        llm_cache: Optional[LLMResponseCache] = None,
+    ):
         self.web_search = web_search
+        self.source_corpora = source_corpora
+        self.llm_cache = llm_cache
 
-    def __call__(self, state: ArticleInputState, config: RunnableConfig):
+    async def __call__(self, state: ArticleInputState, config: RunnableConfig):
         logging.info("initial_research")
 
         topic = state["topic"]
@@ -49,34 +57,43 @@ class InitialResearcher:
 
         user_prompt = "Generate search queries on the provided topic."
 
-        query_list = self.generate_search_queries(
-            configurable.planner_model, configurable.max_tokens, system_prompt, user_prompt)
+        route = configurable.route(ROUTE_QUERY_GENERATION)
+        query_list = await self.generate_search_queries(
+            route.model_id, route.max_tokens, system_prompt, user_prompt)
 
         logger.info(f"Generated queries: {query_list}")
 
-        search_results = asyncio.run(self.web_search.search(query_list))
+        response = await self.web_search.search(query_list)
+        if response.failed:
+            logger.warning(
+                f"{len(response.failed)} of {len(query_list)} search queries failed: {response.failed_queries}")
+        search_results = response.results
+        if self.source_corpora is not None:
+            self.source_corpora.for_config(config).add(search_results)
 
-        source_str = format_web_search(
-            search_results, max_tokens_per_source=1000, include_raw_content=False
-        )
+        # The sources are given to the outline generation
+        outline_route = configurable.route(ROUTE_OUTLINE)
+        token_budget = source_token_budget(
+            outline_route.model_id, outline_route.max_tokens, configurable.max_source_tokens)
+        source_str = pack_sources(search_results, token_budget)
 
         return {"source_str": source_str}
 
-    @exponential_backoff_retry(ClientError, max_retries=10)
-    def generate_search_queries(self, model_id: str, max_tokens: int, system_prompt: str, user_prompt: str) -> List[str]:
-        planner_model = ChatBedrock(
-            model_id=model_id, max_tokens=max_tokens)
-
-        structured_model = planner_model.with_structured_output(Queries)
+    async def generate_search_queries(self, model_id: str, max_tokens: int, system_prompt: str, user_prompt: str) -> List[str]:
+        planner_model = get_bedrock_clients().get_chat_model(model_id, max_tokens)
 
         # Generate queries
-        results = structured_model.invoke(
+        results = await ainvoke_model(
+            planner_model,
             [SystemMessage(content=system_prompt)]
             + [
                 HumanMessage(
                     content=user_prompt
                 )
-            ]
+            ],
+            schema=Queries,
+            cache=self.llm_cache,
+            route=ROUTE_QUERY_GENERATION,
         )
 
         return results.queries
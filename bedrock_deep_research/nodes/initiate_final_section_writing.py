@@ -12,7 +12,8 @@ def initiate_final_section_writing(state: ArticleState):
             "write_final_sections",
             {
                 "section": s,
-                "report_sections_from_research": state["report_sections_from_research"],
+                "research_digest": state["research_digest"],
+                "report_sections_ref": state["report_sections_ref"],
             },
         )
         for s in state["sections"]
@@ -1,13 +1,14 @@
 import logging
+from typing import Optional
 
-from botocore.client import ClientError
-from langchain_aws import ChatBedrock
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 
-from ..config import Configuration
+from ..bedrock_clients import get_bedrock_clients
+from ..config import ROUTE_QUERY_GENERATION, Configuration
+from ..llm import ainvoke_model
+from ..llm_cache import LLMResponseCache
 from ..model import Queries, Section, SectionState
-from ..utils import exponential_backoff_retry
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +39,10 @@ Your queries should be:
 class SectionSearchQueryGenerator:
     N = "generate_section_search_queries"
 
-    def __call__(self, state: SectionState, config: RunnableConfig):
+    def __init__(self, llm_cache: Optional[LLMResponseCache] = None):
+        self.llm_cache = llm_cache
+
+    async def __call__(self, state: SectionState, config: RunnableConfig):
         """Generate search queries for a article section"""
 
         # Get state
@@ -48,26 +52,36 @@ class SectionSearchQueryGenerator:
         configurable = Configuration.from_runnable_config(config)
 
         try:
-            queries = generate_section_queries(configurable, section)
+            route = configurable.route(ROUTE_QUERY_GENERATION)
+            queries = await generate_section_queries(
+                route.model_id, route.max_tokens, configurable.number_of_queries, section,
+                self.llm_cache)
         except Exception as e:
             logger.error(f"Error generating search queries: {e}")
             raise e
         return {"search_queries": queries.queries}
 
 
-@exponential_backoff_retry(ClientError, max_retries=10)
-def generate_section_queries(configurable: Configuration, section: Section) -> Queries:
-    planner_model = ChatBedrock(
-        model_id=configurable.planner_model, max_tokens=configurable.max_tokens
-    ).with_structured_output(Queries)
+async def generate_section_queries(
+    model_id: str,
+    max_tokens: int,
+    number_of_queries: int,
+    section: Section,
+    llm_cache: Optional[LLMResponseCache] = None,
+) -> Queries:
+    planner_model = get_bedrock_clients().get_chat_model(model_id, max_tokens)
 
     # Format system instructions
     system_instructions = query_writer_instructions.format(
-        section_topic=section.description, number_of_queries=configurable.number_of_queries
+        section_topic=section.description, number_of_queries=number_of_queries
     )
 
     # Generate queries
-    return planner_model.invoke(
+    return await ainvoke_model(
+        planner_model,
         [SystemMessage(content=system_instructions)]
-        + [HumanMessage(content="Generate search queries on the provided topic.")]
+        + [HumanMessage(content="Generate search queries on the provided topic.")],
+        schema=Queries,
+        cache=llm_cache,
+        route=ROUTE_QUERY_GENERATION,
     )
@@ -1,11 +1,15 @@
-import asyncio
 import logging
+from contextlib import aclosing
+from typing import Optional
 
 from langchain_core.runnables import RunnableConfig
 
+from ..config import ROUTE_DRAFT, Configuration
+from ..context_packer import pack_sources, source_token_budget
 from ..model import SectionState, Source
-from ..utils import format_web_search
-from ..web_search import WebSearch
+from ..retrieval import RunCorpora
+from ..utils import canonicalize_url
+from ..web_search import SourceDeduplicator, WebSearch
 
 logger = logging.getLogger(__name__)
 
@@ -15,40 +19,126 @@ class SectionWebResearcher:
 
     N = "section_search_web"
 
-    def __init__(self, web_search: WebSearch):
+    def __init__(self, web_search: WebSearch, source_corpora: Optional[RunCorpora] = None):
         self.web_search = web_search
+        self.source_corpora = source_corpora
 
-    def __call__(self, state: SectionState, config: RunnableConfig):
+    async def __call__(self, state: SectionState, config: RunnableConfig):
         """Search the web for each query, then return a list of raw sources and a formatted string of sources."""
 
         # Get state
+        section = state["section"]
         search_queries = state["search_queries"]
-
-        # Web search
+        configurable = Configuration.from_runnable_config(config)
+        evidence = state.get("evidence", {})
+        source_corpus = self.source_corpora.for_config(
+            config) if self.source_corpora is not None else None
+
+        # Seeded with the sources of the previous iterations, so only new sources are kept
+        deduplicator = SourceDeduplicator(WebSearch.NEAR_DUPLICATE_DISTANCE)
+        deduplicator.add(list(evidence.values()))
+        search_results = []
+        executed_queries = []
+        failed_queries = []
+
+        # Queries covered by the sources already fetched during the run skip the web search,
+        # unless the corpus only has sources the section already has
+        web_queries = []
+        for query in search_queries:
+            corpus_results = source_corpus.lookup(
+                query) if source_corpus is not None else None
+            new_results = deduplicator.add(corpus_results) if corpus_results else []
+            if not new_results:
+                web_queries.append(query)
+            else:
+                executed_queries.append(query)
+                search_results.extend(new_results)
+
+        if source_corpus is not None:
+            logger.info(
+                f"{len(search_queries) - len(web_queries)} of {len(search_queries)} queries covered by the run corpus")
+
+        # Web search, collecting the results of each query as soon as they arrive
         try:
-            logger.debug(f"Search Queries: {search_queries}")
-
-            search_results = asyncio.run(
-                self.web_search.search(search_queries))
+            logger.debug(f"Search Queries: {web_queries}")
+
+            if web_queries and not self._has_enough_sources(search_results, configurable):
+                async with aclosing(self.web_search.search_stream(web_queries)) as results:
+                    async for query_results in results:
+                        if query_results.error is not None:
+                            # Not recorded as executed, so a follow-up may retry it
+                            failed_queries.append(query_results.query)
+                            continue
+
+                        executed_queries.append(query_results.query)
+                        if source_corpus is not None:
+                            source_corpus.add(query_results.results)
+                        search_results.extend(
+                            deduplicator.add(query_results.results))
+
+                        if self._has_enough_sources(search_results, configurable):
+                            logger.info(
+                                f"Enough sources after {len(executed_queries)} of {len(search_queries)} queries")
+                            break
 
-            source_str = format_web_search(
-                search_results, max_tokens_per_source=5000, include_raw_content=False
-            )
+        except Exception as e:
+            logger.error(f"Error searching web: {e}")
 
-            sources = []
+        if failed_queries:
+            logger.warning(
+                f"{len(failed_queries)} of {len(search_queries)} queries failed, "
+                f"writing with {len(search_results)} sources: {failed_queries}")
+
+        sources = [
+            Source(title=search_result["title"], url=search_result["url"])
+            for search_result in search_results
+        ]
+        new_evidence = {
+            canonicalize_url(search_result["url"]): {
+                k: v for k, v in search_result.items() if k != "raw_content"}
+            for search_result in search_results
+        }
 
-            for search_result in search_results:
-                sources.append(
-                    Source(title=search_result["title"],
-                           url=search_result["url"])
-                )
+        if search_results and configurable.section_use_raw_content:
+            search_results = await self.web_search.with_raw_content(search_results)
+
+        draft_route = configurable.route(ROUTE_DRAFT)
+        token_budget = source_token_budget(
+            draft_route.model_id, draft_route.max_tokens, configurable.max_source_tokens)
+        prior_budget = min(configurable.max_prior_source_tokens,
+                           token_budget // 2) if evidence else 0
+
+        # Delta view: the sources found in this iteration
+        source_str = (
+            pack_sources(
+                search_results,
+                token_budget - prior_budget,
+                include_raw_content=configurable.section_use_raw_content,
+                focus_queries=[section.description] + executed_queries,
+                header="New sources:\n\n",
+            )
+            if search_results
+            else ""
+        )
+        # Cumulative view: the best sources of the previous iterations, summaries only
+        if prior_budget:
+            prior_str = pack_sources(
+                list(evidence.values()),
+                prior_budget,
+                header="Sources from previous iterations:\n\n",
+            )
+            source_str = f"{source_str}\n\n{prior_str}".strip()
 
-        except Exception as e:
-            logger.error(f"Error searching web: {e}")
-            source_str = ""
+        logger.info(
+            f"{len(search_results)} new sources, {len(evidence)} from previous iterations")
 
         return {
             "source_str": source_str,
             "sources": sources,
+            "evidence": new_evidence,
+            "query_history": executed_queries,
             "search_iterations": state["search_iterations"] + 1,
         }
+
+    def _has_enough_sources(self, search_results, configurable: Configuration) -> bool:
+        return 0 < configurable.search_min_sources <= len(search_results)
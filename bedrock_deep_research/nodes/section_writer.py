@@ -1,7 +1,6 @@
 import logging
-from typing import List, Literal
+from typing import List, Literal, Optional
 
-from botocore.exceptions import ClientError
 from langchain_aws import ChatBedrock
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
@@ -9,9 +8,14 @@ from langgraph.graph import END
 from langgraph.types import Command
 from pydantic import BaseModel, Field
 
-from ..config import Configuration
+from ..config import ROUTE_DRAFT, ROUTE_GRADE, Configuration
+from ..llm import ainvoke_model
+from ..llm_cache import LLMResponseCache
 from ..model import Section, SectionState
-from ..utils import exponential_backoff_retry
+from ..prompt_cache import (cacheable_system_message, caches_prefix,
+                            create_chat_model)
+from ..similarity import NearDuplicateFilter
+from ..streaming import section_metadata
 from .section_web_researcher import SectionWebResearcher
 
 logger = logging.getLogger(__name__)
@@ -28,20 +32,10 @@ class Feedback(BaseModel):
     )
 
 
-# Section writer instructions
+# Section writer instructions, static so that they form a cacheable prompt prefix
 section_writer_instructions = """You are an expert technical writer crafting one section of a technical article.
 
-<Section topic>
-{section_topic}
-</Section topic>
-
-<Existing section content (if populated)>
-{section_content}
-</Existing section content>
-
-<Source material>
-{context}
-</Source material>
+You are given the section topic, the existing section content (if populated) and the source material.
 
 <Guidelines for writing>
 1. If the existing section content is not populated, write a new section from scratch.
@@ -60,7 +54,7 @@ section_writer_instructions = """You are an expert technical writer crafting one
     - Use `*` or `-` for unordered lists
     - Use `1.` for ordered lists
     - Ensure proper indentation and spacing
-- End with ### Sources that references the below source material formatted as:
+- End with ### Sources that references the source material formatted as:
   * List each source with title, date, and URL
   * Format: `- Title : URL`
 {writing_guidelines}
@@ -74,16 +68,22 @@ section_writer_instructions = """You are an expert technical writer crafting one
 </Quality checks>
 """
 
-# Instructions for section grading
-section_grader_instructions = """Review a section of an article relative to the specified topic:
-
-<section topic>
+section_writer_inputs = """<Section topic>
 {section_topic}
-</section topic>
+</Section topic>
 
-<section content>
-{section}
-</section content>
+<Existing section content (if populated)>
+{section_content}
+</Existing section content>
+
+<Source material>
+{context}
+</Source material>
+
+Generate a section of the article based on the provided sources."""
+
+# Instructions for section grading
+section_grader_instructions = """Review a section of an article relative to the specified topic.
 
 <task>
 Evaluate whether the section adequately covers the topic by checking technical accuracy and depth.
@@ -101,13 +101,26 @@ If the section fails any criteria, generate specific follow-up search queries to
 </format>
 """
 
+section_grader_inputs = """<section topic>
+{section_topic}
+</section topic>
+
+<section content>
+{section}
+</section content>
+
+Grade the article and consider follow-up questions for missing information:"""
+
 
 class SectionWriter:
     """Write a section of the article"""
 
     N = "section_write"
 
-    def __call__(self, state: SectionState, config: RunnableConfig) -> Command[Literal[END, SectionWebResearcher.N]]:
+    def __init__(self, llm_cache: Optional[LLMResponseCache] = None):
+        self.llm_cache = llm_cache
+
+    async def __call__(self, state: SectionState, config: RunnableConfig) -> Command[Literal[END, SectionWebResearcher.N]]:
         """Write a section of the article"""
 
         # Get state
@@ -119,88 +132,138 @@ class SectionWriter:
         configurable = Configuration.from_runnable_config(config)
         writing_guidelines = configurable.writing_guidelines
 
+        draft_route = configurable.route(ROUTE_DRAFT)
+        grade_route = configurable.route(ROUTE_GRADE)
+
         try:
-            writer_model = ChatBedrock(
-                model_id=configurable.writer_model, max_tokens=configurable.max_tokens)
+            writer_instructions = section_writer_instructions.format(
+                writing_guidelines=writing_guidelines)
+            writer_caching = caches_prefix(
+                writer_instructions, draft_route.model_id, configurable.prompt_caching_enabled)
+            grader_caching = caches_prefix(
+                section_grader_instructions, grade_route.model_id, configurable.prompt_caching_enabled)
+
+            writer_model = create_chat_model(
+                draft_route.model_id,
+                prompt_caching=writer_caching,
+                max_tokens=draft_route.max_tokens,
+            )
+            grader_model = create_chat_model(
+                grade_route.model_id,
+                prompt_caching=grader_caching,
+                max_tokens=grade_route.max_tokens,
+            )
+            writer_system_message = cacheable_system_message(
+                writer_instructions, writer_caching)
+            grader_system_message = cacheable_system_message(
+                section_grader_instructions, grader_caching)
 
-            section.content = self._generate_section_content(
+            section.content = await self._generate_section_content(
                 writer_model,
-                section_writer_instructions,
+                writer_system_message,
                 section,
                 source_str,
-                writing_guidelines,
+                state["search_iterations"],
             )
             section.sources = sources
 
-            feedback = self._grade_section_content(
-                writer_model, section_grader_instructions, section
+            feedback = await self._grade_section_content(
+                grader_model, grader_system_message, section
             )
 
         except Exception as e:
             logger.error(f"Error writing section: {e}")
             raise e
 
+        follow_up_queries = []
         if (
-            feedback.grade == "pass"
-            or state["search_iterations"] >= configurable.max_search_depth
+            feedback.grade == "fail"
+            and state["search_iterations"] < configurable.max_search_depth
         ):
+            follow_up_queries = self._filter_follow_up_queries(
+                feedback.follow_up_queries,
+                state.get("query_history", []),
+                configurable,
+            )
+
+        if not follow_up_queries:
             # Publish the section to completed sections
             return Command(update={"completed_sections": [section]}, goto=END)
         else:
             # Update the existing section with new content and update search queries
             return Command(
                 update={
-                    "search_queries": feedback.follow_up_queries,
+                    "search_queries": follow_up_queries,
                     "section": section,
                 },
                 goto=SectionWebResearcher.N,
             )
 
-    @exponential_backoff_retry(ClientError, max_retries=10)
-    def _generate_section_content(
+    def _filter_follow_up_queries(
+        self,
+        follow_up_queries: List[str],
+        query_history: List[str],
+        configurable: Configuration,
+    ) -> List[str]:
+        """Drops follow-up queries that near-duplicate the queries already executed for the section."""
+        duplicate_filter = NearDuplicateFilter(
+            threshold=configurable.query_similarity_threshold)
+        for query in query_history:
+            duplicate_filter.add(query)
+
+        queries = duplicate_filter.filter(
+            follow_up_queries, limit=configurable.max_follow_up_queries)
+
+        if len(queries) < len(follow_up_queries):
+            logger.info(
+                f"Kept {len(queries)} of {len(follow_up_queries)} follow-up queries: {queries}")
+        return queries
+
+    async def _generate_section_content(
         self,
         model: ChatBedrock,
-        system_prompt: str,
+        system_message: SystemMessage,
         section: Section,
         search_content: str,
-        writing_guidelines: str,
+        iteration: int,
     ) -> str:
-        system_prompt = system_prompt.format(
-            section_title=section.name,
-            section_topic=section.description,
-            context=search_content,
-            section_content=section.content,
-            writing_guidelines=writing_guidelines,
-        )
-
         messages = [
-            SystemMessage(content=system_prompt),
+            system_message,
             HumanMessage(
-                content="Generate a section of the article based on the provided sources."
+                content=section_writer_inputs.format(
+                    section_topic=section.description,
+                    section_content=section.content,
+                    context=search_content,
+                )
             ),
         ]
 
-        section_content = model.invoke(messages)
+        # Tagged with the section, so that its tokens are streamed to the caller
+        section_content = await ainvoke_model(
+            model,
+            messages,
+            cache=self.llm_cache,
+            metadata=section_metadata(section, iteration),
+            route=ROUTE_DRAFT,
+        )
 
         return section_content.content
 
-    @exponential_backoff_retry(ClientError, max_retries=10)
-    def _grade_section_content(
-        self, model: ChatBedrock, system_prompt: str, section: Section
+    async def _grade_section_content(
+        self, model: ChatBedrock, system_message: SystemMessage, section: Section
     ) -> Feedback:
 
-        section_grader_instructions_formatted = system_prompt.format(
-            section_topic=section.description, section=section.content
-        )
-
-        structured_llm = model.with_structured_output(Feedback)
-        feedback = structured_llm.invoke(
-            [SystemMessage(content=section_grader_instructions_formatted)]
+        return await ainvoke_model(
+            model,
+            [system_message]
             + [
                 HumanMessage(
-                    content="Grade the article and consider follow-up questions for missing information:"
+                    content=section_grader_inputs.format(
+                        section_topic=section.description, section=section.content
+                    )
                 )
-            ]
+            ],
+            schema=Feedback,
+            cache=self.llm_cache,
+            route=ROUTE_GRADE,
         )
-
-        return feedback
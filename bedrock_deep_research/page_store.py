@@ -0,0 +1,58 @@
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PageStore:
+    """
+    A content-addressed on-disk store for the full content of web pages.
+
+    Each content is written once under its SHA-256 hash, so search results can reference
+    pages by hash instead of carrying their full text. The URL of the pages stored
+    during the run is indexed to find them again without extracting them twice.
+
+    Attributes:
+        store_dir (Path): Directory holding the page contents
+    """
+
+    def __init__(self, store_dir: str = "page_store"):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._url_index: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_hash(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def put(self, content: str, url: Optional[str] = None) -> str:
+        """Stores the content if not already stored and returns its hash."""
+        content_hash = self.content_hash(content)
+        path = self._path(content_hash)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_text(content, encoding="utf-8")
+            tmp_path.replace(path)
+        if url:
+            with self._lock:
+                self._url_index[url] = content_hash
+        return content_hash
+
+    def get(self, content_hash: str) -> Optional[str]:
+        """Returns the content stored under the hash, None if missing."""
+        try:
+            return self._path(content_hash).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def hash_for_url(self, url: str) -> Optional[str]:
+        with self._lock:
+            return self._url_index.get(url)
+
+    def _path(self, content_hash: str) -> Path:
+        return self.store_dir / content_hash[:2] / f"{content_hash}.txt"
@@ -0,0 +1,105 @@
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_aws import ChatBedrock
+from langchain_core.messages import AIMessage, SystemMessage
+
+from .bedrock_clients import get_bedrock_clients
+from .config import get_model_settings
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Bedrock Converse content block marking the end of a cacheable prompt prefix
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+
+def caches_prefix(instructions: str, model_id: str, prompt_caching: bool = True) -> bool:
+    """
+    Whether a cache checkpoint after the instructions takes effect: the model supports
+    prompt caching and the instructions reach its minimum cacheable prefix length.
+    """
+    settings = get_model_settings(model_id)
+    return (
+        prompt_caching
+        and settings.prompt_caching
+        and estimate_tokens(instructions) >= settings.min_cache_tokens
+    )
+
+
+def create_chat_model(
+    model_id: str, prompt_caching: bool = False, max_tokens: Optional[int] = None, streaming: bool = False
+) -> ChatBedrock:
+    """
+    Returns the shared chat model for the model id. When its prompts hold a cache
+    checkpoint, the model goes through the Converse API, which accepts them.
+    """
+    return get_bedrock_clients().get_chat_model(
+        model_id, max_tokens, streaming=streaming, use_converse=prompt_caching)
+
+
+def cacheable_system_message(instructions: str, cache_point: bool) -> SystemMessage:
+    """
+    Returns the system message holding the static instructions of a prompt, followed by
+    a cache checkpoint if cache_point is set. The instructions must not depend on the
+    section, so that every call made with them shares the cached prefix.
+    """
+    if not cache_point:
+        return SystemMessage(content=instructions)
+    return SystemMessage(content=[{"type": "text", "text": instructions}, CACHE_POINT])
+
+
+def cache_token_usage(message: AIMessage) -> Tuple[int, int]:
+    """Returns the (cache read, cache write) input tokens reported for a model response."""
+    usage_metadata = getattr(message, "usage_metadata", None) or {}
+    details = usage_metadata.get("input_token_details") or {}
+    if details:
+        return details.get("cache_read", 0) or 0, details.get("cache_creation", 0) or 0
+
+    # langchain-aws 0.2 reports the Converse cache usage at the top level of usage_metadata
+    if "cache_read_input_tokens" in usage_metadata or "cache_write_input_tokens" in usage_metadata:
+        return (
+            usage_metadata.get("cache_read_input_tokens", 0) or 0,
+            usage_metadata.get("cache_write_input_tokens", 0) or 0,
+        )
+
+    usage = (getattr(message, "response_metadata", None) or {}).get("usage") or {}
+    return (
+        usage.get("cacheReadInputTokens", usage.get(
+            "cache_read_input_tokens", 0)) or 0,
+        usage.get("cacheWriteInputTokens", usage.get(
+            "cache_creation_input_tokens", 0)) or 0,
+    )
+
+
+class PromptCacheStats:
+    """Process-wide counters of the input tokens read from and written to the prompt cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "input_tokens": 0,
+                       "cache_read_tokens": 0, "cache_write_tokens": 0}
+
+    def record(self, message: AIMessage) -> None:
+        cache_read, cache_write = cache_token_usage(message)
+        input_tokens = ((getattr(message, "usage_metadata", None)
+                        or {}).get("input_tokens") or 0)
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["input_tokens"] += input_tokens
+            self._stats["cache_read_tokens"] += cache_read
+            self._stats["cache_write_tokens"] += cache_write
+        logger.debug(
+            f"Prompt cache: {cache_read} tokens read, {cache_write} tokens written")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats["input_tokens"]
+        stats["cache_hit_rate"] = stats["cache_read_tokens"] / \
+            total if total else 0.0
+        return stats
+
+
+prompt_cache_stats = PromptCacheStats()
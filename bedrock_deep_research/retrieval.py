@@ -0,0 +1,271 @@
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .similarity import tokenize
+from .tokens import estimate_tokens, truncate_to_tokens
+from .utils import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n+|\n(?=\s*[-*#\d])")
+
+
+class BM25Index:
+    """
+    An incremental in-memory inverted index ranking documents with Okapi BM25.
+
+    Attributes:
+        k1 (float): Term frequency saturation
+        b (float): Document length normalization
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Hashable, int]] = defaultdict(dict)
+        self._doc_lengths: Dict[Hashable, int] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._doc_lengths
+
+    def add(self, doc_id: Hashable, text: str) -> None:
+        """Indexes a document, documents already indexed are ignored."""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            if doc_id in self._doc_lengths:
+                return
+            for term, frequency in terms.items():
+                self._postings[term][doc_id] = frequency
+            length = sum(terms.values())
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+
+    def search(self, query: str, top_k: int | None = None) -> List[Tuple[Hashable, float]]:
+        """Returns the (doc_id, score) of the documents matching the query, best first."""
+        with self._lock:
+            n_docs = len(self._doc_lengths)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+
+            scores: Dict[Hashable, float] = defaultdict(float)
+            for term, query_frequency in Counter(tokenize(query)).items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) /
+                               (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b *
+                                      self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += query_frequency * idf * \
+                        frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:top_k] if top_k else ranked
+
+    def term_coverage(self, query: str, doc_id: Hashable) -> float:
+        """Returns the fraction of the distinct query terms found in the document."""
+        terms = set(tokenize(query))
+        if not terms:
+            return 0.0
+        with self._lock:
+            found = sum(
+                1 for term in terms if doc_id in self._postings.get(term, {}))
+        return found / len(terms)
+
+
+class SourceCorpus:
+    """
+    Every source fetched during a run, indexed with BM25 so that any section can reuse
+    the sources found by the initial research or by its sibling sections.
+
+    A query is covered by the corpus when enough indexed sources contain most of its
+    terms, in which case there is no need to search the web for it.
+
+    Attributes:
+        min_results (int): Matching sources needed to consider a query covered
+        min_term_coverage (float): Fraction of the query terms a source must contain to match
+        max_results (int): Maximum sources returned for a covered query
+    """
+
+    def __init__(self, min_results: int = 3, min_term_coverage: float = 0.75, max_results: int = 5):
+        self.min_results = min_results
+        self.min_term_coverage = min_term_coverage
+        self.max_results = max_results
+        self._index = BM25Index()
+        self._sources: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.covered = 0
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def add(self, sources: List[Dict[str, Any]]) -> None:
+        """Indexes the sources not already in the corpus."""
+        for source in sources:
+            key = canonicalize_url(source["url"])
+            with self._lock:
+                if key in self._sources:
+                    continue
+                self._sources[key] = {
+                    k: v for k, v in source.items() if k != "raw_content"}
+            self._index.add(
+                key, f"{source.get('title', '')}\n{source.get('content', '')}")
+
+    def lookup(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Returns the sources matching the query if the corpus covers it, None otherwise."""
+        matches = [
+            doc_id
+            for doc_id, _ in self._index.search(query, top_k=self.max_results * 2)
+            if self._index.term_coverage(query, doc_id) >= self.min_term_coverage
+        ][: self.max_results]
+
+        covered = len(matches) >= self.min_results
+        with self._lock:
+            self.lookups += 1
+            if covered:
+                self.covered += 1
+            return [self._sources[doc_id] for doc_id in matches] if covered else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self._sources),
+                "lookups": self.lookups,
+                "covered": self.covered,
+                "coverage_rate": self.covered / self.lookups if self.lookups else 0.0,
+            }
+
+
+class RunCorpora:
+    """
+    The SourceCorpus of each run (graph thread), so that the runs sharing a graph do not
+    answer each other's queries. The corpus of a run is created by its first lookup and
+    dropped when the run finishes, only its stats are kept.
+
+    Attributes:
+        max_runs (int): Corpora kept, the least recently used are dropped beyond it
+        corpus_kwargs (dict): Arguments of the SourceCorpus of each run
+    """
+
+    def __init__(self, max_runs: int = 100, **corpus_kwargs):
+        self.max_runs = max_runs
+        self.corpus_kwargs = corpus_kwargs
+        self._corpora: OrderedDict[str, SourceCorpus] = OrderedDict()
+        self._finished: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, thread_id: str) -> SourceCorpus:
+        """Returns the corpus of the run, created empty on first use."""
+        thread_id = str(thread_id)
+        with self._lock:
+            corpus = self._corpora.get(thread_id)
+            if corpus is None:
+                corpus = self._corpora[thread_id] = SourceCorpus(**self.corpus_kwargs)
+                self._finished.pop(thread_id, None)
+            self._corpora.move_to_end(thread_id)
+            while len(self._corpora) > self.max_runs:
+                evicted, evicted_corpus = self._corpora.popitem(last=False)
+                logger.debug(f"Dropping the source corpus of run {evicted}")
+                self._keep_stats(evicted, evicted_corpus)
+            return corpus
+
+    def for_config(self, config: Optional[Dict[str, Any]]) -> SourceCorpus:
+        """Returns the corpus of the run of the RunnableConfig of a node."""
+        return self.get(((config or {}).get("configurable") or {}).get("thread_id"))
+
+    def drop(self, thread_id: str) -> None:
+        """Frees the sources of the run, keeping the stats of its corpus."""
+        with self._lock:
+            corpus = self._corpora.pop(str(thread_id), None)
+            if corpus is not None:
+                self._keep_stats(str(thread_id), corpus)
+
+    def stats(self, thread_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Returns the stats of the corpus of the run, or their totals over all runs."""
+        with self._lock:
+            if thread_id is not None:
+                corpus = self._corpora.get(str(thread_id))
+                return corpus.stats() if corpus is not None else self._finished.get(str(thread_id))
+            runs = [corpus.stats() for corpus in self._corpora.values()]
+            runs.extend(self._finished.values())
+
+        totals = {name: sum(run[name] for run in runs)
+                  for name in ("documents", "lookups", "covered")}
+        totals["coverage_rate"] = totals["covered"] / \
+            totals["lookups"] if totals["lookups"] else 0.0
+        return {"runs": len(runs), **totals}
+
+    def _keep_stats(self, thread_id: str, corpus: SourceCorpus) -> None:
+        self._finished[thread_id] = corpus.stats()
+        while len(self._finished) > self.max_runs * 10:
+            self._finished.popitem(last=False)
+
+
+def split_passages(text: str, passage_tokens: int = 150) -> List[str]:
+    """Splits the text on sentence and paragraph boundaries into passages of about passage_tokens."""
+    passages = []
+    current = []
+    current_tokens = 0
+    for sentence in _SENTENCE_BOUNDARY.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        tokens = estimate_tokens(sentence)
+        if current and current_tokens + tokens > passage_tokens:
+            passages.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def select_passages(
+    text: str, queries: List[str], token_budget: int, passage_tokens: int = 150
+) -> str:
+    """
+    Keeps the passages of the text most relevant to the queries within the token budget.
+
+    Passages are ranked with BM25 against the queries and returned in their original
+    order. The text is returned unchanged if it fits the budget, and truncated if no
+    passage matches the queries.
+    """
+    if estimate_tokens(text) <= token_budget:
+        return text
+
+    # Smaller passages for small budgets, so that a few of them can be kept
+    passages = split_passages(text, max(30, min(passage_tokens, token_budget // 3)))
+    index = BM25Index()
+    for i, passage in enumerate(passages):
+        index.add(i, passage)
+
+    ranked = index.search(" ".join(queries))
+    if not ranked:
+        return truncate_to_tokens(text, token_budget)
+
+    separator = "\n...\n"
+    selected = []
+    remaining = token_budget
+    for i, _ in ranked:
+        tokens = estimate_tokens(passages[i]) + estimate_tokens(separator)
+        if tokens <= remaining:
+            selected.append(i)
+            remaining -= tokens
+
+    if not selected:
+        return truncate_to_tokens(text, token_budget)
+
+    return separator.join(passages[i] for i in sorted(selected))
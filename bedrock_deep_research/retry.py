@@ -0,0 +1,409 @@
+import asyncio
+import inspect
+import logging
+import random
+import threading
+import time
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from botocore.exceptions import (ClientError, ConnectTimeoutError,
+                                 EndpointConnectionError, ReadTimeoutError)
+
+from .limiters import AdaptiveConcurrencyLimit, get_adaptive_limit
+from .metrics import record_retry
+from .utils import CustomError
+
+logger = logging.getLogger(__name__)
+
+# Error codes of transient Bedrock failures, worth retrying
+RETRYABLE_ERROR_CODES = frozenset(
+    ["ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException",
+     "ServiceUnavailable", "InternalServerException", "ModelNotReadyException",
+     "ModelTimeoutException", "RequestTimeout", "RequestTimeoutException"]
+)
+THROTTLING_ERROR_CODES = frozenset(
+    ["ThrottlingException", "TooManyRequestsException"])
+RETRYABLE_EXCEPTIONS = (ReadTimeoutError,
+                        ConnectTimeoutError, EndpointConnectionError)
+
+
+class RetryBudget:
+    """
+    A process-wide allowance of retries shared by every caller of a model, so that a
+    fan-out of failing calls cannot multiply the load on a struggling service.
+
+    Each retry spends one token and each successful call earns `ratio` tokens back, so
+    that retries stay below about `ratio` of the calls once the initial tokens are spent.
+
+    Attributes:
+        capacity (float): Maximum and initial number of tokens
+        ratio (float): Tokens earned by each successful call
+    """
+
+    def __init__(self, capacity: float = 50.0, ratio: float = 0.2):
+        self.capacity = capacity
+        self.ratio = ratio
+        self._tokens = capacity
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            return self._tokens
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Takes a token for a retry, returns False if the budget is exhausted."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Stops calling a model after too many consecutive failures.
+
+    The circuit opens after `failure_threshold` consecutive failed attempts and rejects
+    calls for `reset_timeout` seconds. Then a single trial call is let through: the
+    circuit closes if it succeeds and opens again if it fails. A trial ending without
+    telling whether the model recovered (throttled or cancelled) lets another one through.
+
+    Attributes:
+        failure_threshold (int): Consecutive failures opening the circuit
+        reset_timeout (float): Seconds the circuit stays open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 20, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def seconds_until_trial(self) -> float:
+        """Seconds left before the open circuit lets a trial call through, 0 if not open."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Lets another trial call through, the trial in flight ended without an outcome."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_in_flight:
+                    logger.warning(
+                        f"Opening circuit after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class CircuitOpenError(CustomError):
+    pass
+
+
+class RetryEngine:
+    """
+    Retries the transient failures of the calls to one model, with decorrelated jitter
+    backoff, a retry budget and a circuit breaker shared by all its callers.
+
+    Throttling does not count toward the circuit breaker, the adaptive concurrency limit
+    and the retry budget handle it. New calls are rejected while the circuit is open,
+    calls already retrying wait for it to let a trial through instead.
+
+    Attributes:
+        name (str): Name of the retried resource, usually a model id
+        base_delay (float): Minimum seconds between two attempts
+        max_delay (float): Maximum seconds between two attempts
+        budget (RetryBudget): Retries allowed across all callers
+        breaker (CircuitBreaker): Rejects calls while the model keeps failing
+        concurrency (AdaptiveConcurrencyLimit | None): Limits the async calls in flight,
+            adapting the limit to the throttling of the model
+    """
+
+    # Seconds between two checks of a half-open circuit whose trial call is in flight
+    CIRCUIT_POLL_INTERVAL = 0.5
+
+    def __init__(
+        self,
+        name: str,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        budget: Optional[RetryBudget] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        concurrency: Optional[AdaptiveConcurrencyLimit] = None,
+    ):
+        self.name = name
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0,
+                       "failures": 0, "rejected": 0}
+
+    def call(self, func, *args, max_retries: int = 10, **kwargs):
+        """Calls func, sleeping between the attempts."""
+        delay = self.base_delay
+        self._increment("calls")
+        for attempt in range(max_retries + 1):
+            deadline = time.monotonic() + self.breaker.reset_timeout + self.max_delay
+            while (wait := self._circuit_wait(attempt, deadline)) is not None:
+                time.sleep(wait)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(e, attempt, max_retries, delay)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release_trial()
+                raise
+            self._record_success()
+            return result
+
+    async def acall(self, func, *args, max_retries: int = 10, **kwargs):
+        """Awaits the coroutine function func, sleeping between the attempts without blocking the loop."""
+        delay = self.base_delay
+        self._increment("calls")
+        for attempt in range(max_retries + 1):
+            deadline = time.monotonic() + self.breaker.reset_timeout + self.max_delay
+            while (wait := self._circuit_wait(attempt, deadline)) is not None:
+                await asyncio.sleep(wait)
+            try:
+                result = await self._limited(func, args, kwargs)
+            except Exception as e:
+                delay = self._next_delay(e, attempt, max_retries, delay)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled, the attempt tells nothing about the model
+                self.breaker.release_trial()
+                raise
+            self._record_success()
+            return result
+
+    async def _limited(self, func, args, kwargs):
+        """Awaits func within the concurrency limit, reporting its outcome to the limit."""
+        if self.concurrency is None:
+            return await func(*args, **kwargs)
+
+        epoch = await self.concurrency.acquire()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            if is_throttling(e):
+                self.concurrency.record_throttle(epoch)
+            raise
+        finally:
+            self.concurrency.release()
+        self.concurrency.record_success()
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["budget_tokens"] = self.budget.tokens
+        stats["circuit"] = self.breaker.state
+        return stats
+
+    def _increment(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _circuit_wait(self, attempt: int, deadline: float) -> Optional[float]:
+        """
+        Returns None if the attempt may call the model, otherwise the seconds to wait before
+        asking again. Raises if the call is new, or has waited past the deadline.
+        """
+        if self.breaker.allow():
+            return None
+        if attempt == 0 or time.monotonic() >= deadline:
+            self._increment("rejected")
+            raise CircuitOpenError(
+                message=f"Too many consecutive errors calling {self.name}, calls are paused "
+                f"for {self.breaker.reset_timeout:.0f} seconds. Try again later.")
+        # Once the window is over, poll while another caller makes the trial call
+        return max(self.breaker.seconds_until_trial(), self.CIRCUIT_POLL_INTERVAL)
+
+    def _record_success(self) -> None:
+        self.breaker.record_success()
+        self.budget.record_success()
+
+    def _next_delay(self, e: Exception, attempt: int, max_retries: int, delay: float) -> float:
+        """Returns the seconds to wait before retrying, or raises if e is not retried."""
+        if not is_retryable(e):
+            # The model answered, so the circuit can stay closed
+            self.breaker.record_success()
+
+        if isinstance(e, ClientError):
+            code = e.response["Error"]["Code"]
+            if code == "ExpiredTokenException":
+                logger.error(
+                    "Expired token error. Please check/update your Security Token included in the request")
+                raise CustomError(
+                    message="Expired Token. Please update the AWS credentials, to connect to the boto Client.") from e
+            if code not in RETRYABLE_ERROR_CODES:
+                logger.error(f"Client Error Raised: {e}")
+                raise e
+        elif not isinstance(e, RETRYABLE_EXCEPTIONS):
+            raise e
+
+        if is_throttling(e):
+            # The model is up, the adaptive concurrency limit backs off instead
+            self.breaker.release_trial()
+        else:
+            self.breaker.record_failure()
+        self._increment("failures")
+        error = e.response["Error"]["Code"] if isinstance(
+            e, ClientError) else type(e).__name__
+
+        if attempt == max_retries:
+            logger.error(
+                f"Calling {self.name} failed after {max_retries} retries: {error}")
+            raise CustomError(
+                message=f"{error} raised.. Retry limit of {max_retries} retries reached.") from e
+        if not self.budget.try_spend():
+            logger.error(
+                f"Retry budget of {self.name} exhausted, not retrying: {error}")
+            raise CustomError(
+                message=f"{error} raised.. Too many retries in progress for {self.name}. Try again later.") from e
+
+        self._increment("retries")
+        record_retry()
+        # Decorrelated jitter, so that concurrent callers do not retry in lockstep
+        sleep_time = min(self.max_delay, random.uniform(
+            self.base_delay, delay * 3))
+        hint = _retry_after(e)
+        if hint is not None:
+            sleep_time = min(self.max_delay, max(sleep_time, hint))
+        logger.info(
+            f"Attempt {attempt + 1} calling {self.name} failed with {error}. Retrying in {sleep_time:.2f} seconds...")
+        return sleep_time
+
+
+def is_throttling(e: Exception) -> bool:
+    """Whether the error reports that the caller exceeds its quota."""
+    return isinstance(e, ClientError) and e.response["Error"]["Code"] in THROTTLING_ERROR_CODES
+
+
+def is_retryable(e: Exception) -> bool:
+    """Whether the error is a transient failure of the service."""
+    if isinstance(e, ClientError):
+        return e.response["Error"]["Code"] in RETRYABLE_ERROR_CODES
+    return isinstance(e, RETRYABLE_EXCEPTIONS)
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    """Returns the seconds to wait suggested by the service in the Retry-After header, if any."""
+    if not isinstance(e, ClientError):
+        return None
+    headers = e.response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+    value = headers.get("retry-after") or headers.get("x-amz-retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+_engines: Dict[str, RetryEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_retry_engine(name: str) -> RetryEngine:
+    """
+    Returns the process-wide retry engine of the model, created on first use.
+    Its async calls go through the adaptive concurrency limit of the model.
+    """
+    with _engines_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            engine = _engines[name] = RetryEngine(
+                name, concurrency=get_adaptive_limit(name))
+        return engine
+
+
+def get_retry_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns the retry counters of every model called so far."""
+    with _engines_lock:
+        engines = dict(_engines)
+    return {name: engine.get_stats() for name, engine in engines.items()}
+
+
+def with_retries(model_arg: str, max_retries: int = 10):
+    """
+    Decorator retrying the transient Bedrock failures of a sync or async function,
+    through the shared retry engine of the model it calls.
+
+    Args:
+        model_arg: Name of the argument holding the model id, or a model with a model_id
+        max_retries: Maximum number of retry attempts
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def engine_for(args, kwargs) -> RetryEngine:
+            model = signature.bind(*args, **kwargs).arguments[model_arg]
+            return get_retry_engine(getattr(model, "model_id", model))
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await engine_for(args, kwargs).acall(
+                    func, *args, max_retries=max_retries, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return engine_for(args, kwargs).call(
+                func, *args, max_retries=max_retries, **kwargs)
+        return wrapper
+
+    return decorator
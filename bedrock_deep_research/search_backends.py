@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from tavily import AsyncTavilyClient
+
+from .similarity import MinHash, shingles
+
+logger = logging.getLogger(__name__)
+
+
+class SearchBackend(ABC):
+    """
+    A web search provider used by WebSearch.
+
+    Implementations return one response per query in the Tavily response format:
+    {'query': str, 'results': [{'title', 'url', 'content', 'score', 'raw_content'}, ...]}
+    """
+
+    name: str
+
+    @abstractmethod
+    async def search(
+        self, query: str, max_results: int, include_raw_content: bool, topic: str
+    ) -> Dict[str, Any]:
+        """Runs a single search query."""
+
+    async def extract(self, urls: List[str]) -> Dict[str, str]:
+        """Returns the full content of the pages, by URL. Pages that cannot be extracted are omitted."""
+        return {}
+
+
+class TavilySearchBackend(SearchBackend):
+    """Searches the web with the Tavily API."""
+
+    name = "tavily"
+
+    def __init__(self, tavily_api_key: str):
+        self.tavily_async = AsyncTavilyClient(api_key=tavily_api_key)
+
+    async def search(
+        self, query: str, max_results: int, include_raw_content: bool, topic: str
+    ) -> Dict[str, Any]:
+        return await self.tavily_async.search(
+            query,
+            max_results=max_results,
+            include_raw_content=include_raw_content,
+            topic=topic,
+        )
+
+    async def extract(self, urls: List[str]) -> Dict[str, str]:
+        response = await self.tavily_async.extract(urls=urls)
+        for failed in response.get("failed_results", []):
+            logger.warning(f"Unable to extract page content: {failed}")
+        return {
+            result["url"]: result["raw_content"]
+            for result in response.get("results", [])
+            if result.get("raw_content")
+        }
+
+
+class ReplaySearchBackend(SearchBackend):
+    """
+    Serves search responses from a directory of saved `search_<sha256>.json` files,
+    as written by WebSearch when save_search_results is enabled. No network is used.
+
+    Queries without a saved response are answered with the most similar saved query
+    when one is close enough, otherwise with an empty result list.
+
+    Attributes:
+        search_results_dir (Path): Directory containing the saved responses
+        latency (float): Seconds added to every search to simulate the network
+        latency_jitter (float): Maximum random seconds added on top of latency
+        min_similarity (float): Minimum query similarity to fall back to a saved response
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        search_results_dir: str = "search_results",
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        min_similarity: float = 0.5,
+    ):
+        self.search_results_dir = Path(search_results_dir)
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.min_similarity = min_similarity
+        self._minhash = MinHash()
+        self._responses: Dict[str, Dict[str, Any]] = {}
+        self._signatures: Dict[str, tuple[int, ...]] = {}
+        self._raw_contents: Dict[str, str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        for file_path in sorted(self.search_results_dir.glob("search_*.json")):
+            try:
+                response = json.loads(file_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable search result {file_path}: {e}")
+                continue
+            query = response.get("query", "")
+            self._responses[query] = response
+            for result in response.get("results", []):
+                if result.get("raw_content"):
+                    self._raw_contents[result["url"]] = result["raw_content"]
+            self._signatures[query] = self._minhash.signature(shingles(query))
+
+        if not self._responses:
+            logger.warning(
+                f"No saved search results found in {self.search_results_dir}")
+
+    async def search(
+        self, query: str, max_results: int, include_raw_content: bool, topic: str
+    ) -> Dict[str, Any]:
+        delay = self.latency + random.uniform(0, self.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        response = self._responses.get(query) or self._find_similar(query)
+        if response is None:
+            logger.info(f"No saved search result for query: {query}")
+            return {"query": query, "results": []}
+
+        results = [dict(r) for r in response.get("results", [])[:max_results]]
+        if not include_raw_content:
+            for result in results:
+                result["raw_content"] = None
+        return {**response, "query": query, "results": results}
+
+    async def extract(self, urls: List[str]) -> Dict[str, str]:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return {url: self._raw_contents[url] for url in urls if url in self._raw_contents}
+
+    def _find_similar(self, query: str) -> Optional[Dict[str, Any]]:
+        if not self._signatures:
+            return None
+        signature = self._minhash.signature(shingles(query))
+        best_query, best_similarity = max(
+            ((q, MinHash.similarity(signature, s))
+             for q, s in self._signatures.items()),
+            key=lambda item: item[1],
+        )
+        if best_similarity < self.min_similarity:
+            return None
+        logger.debug(
+            f"Replaying '{best_query}' for '{query}' (similarity {best_similarity:.2f})")
+        return self._responses[best_query]
+
+    @staticmethod
+    def file_name(query: str) -> str:
+        """Name of the file holding the saved response of a query."""
+        return f"search_{hashlib.sha256(query.encode()).hexdigest()}.json"
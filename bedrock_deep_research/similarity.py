@@ -0,0 +1,129 @@
+import hashlib
+import random
+import re
+from typing import Iterable, List
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it of on or the to vs what "
+    "when where which with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases the text and splits it into alphanumeric tokens, dropping stopwords."""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def shingles(text: str, k: int = 4) -> set[str]:
+    """
+    Returns the character k-grams of each token of the text.
+    Shingling tokens independently makes the set insensitive to word order.
+    """
+    result = set()
+    for token in tokenize(text):
+        padded = f"_{token}_"
+        if len(padded) <= k:
+            result.add(padded)
+        else:
+            result.update(padded[i: i + k] for i in range(len(padded) - k + 1))
+    return result
+
+
+def hash64(value: str) -> int:
+    """A stable 64-bit hash, unlike hash() it does not change between processes."""
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+    )
+
+
+class MinHash:
+    """
+    MinHash signatures estimating the Jaccard similarity of shingle sets.
+
+    Attributes:
+        num_perm (int): Number of hash functions, i.e. the signature length
+    """
+
+    _PRIME = (1 << 61) - 1
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        self.num_perm = num_perm
+        rng = random.Random(seed)
+        self._params = [
+            (rng.randrange(1, self._PRIME), rng.randrange(0, self._PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingle_set: Iterable[str]) -> tuple[int, ...]:
+        hashes = [hash64(s) for s in shingle_set]
+        if not hashes:
+            return tuple([self._PRIME] * self.num_perm)
+        return tuple(
+            min((a * h + b) % self._PRIME for h in hashes) for a, b in self._params
+        )
+
+    @staticmethod
+    def similarity(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+        return sum(a == b for a, b in zip(sig_a, sig_b)) / len(sig_a)
+
+
+def simhash(text: str, ngram: int = 3) -> int:
+    """
+    64-bit SimHash of the word n-grams of the text. Near-duplicate texts have
+    fingerprints that differ in few bits.
+    """
+    words = _TOKEN_PATTERN.findall(text.lower())
+    features = [
+        " ".join(words[i: i + ngram]) for i in range(max(1, len(words) - ngram + 1))
+    ]
+    weights = [0] * 64
+    for feature in features:
+        h = hash64(feature)
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateFilter:
+    """
+    Remembers texts and detects new ones that are lexical near-duplicates of them.
+
+    Attributes:
+        threshold (float): Estimated Jaccard similarity from which a text is a duplicate
+    """
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 128):
+        self.threshold = threshold
+        self._minhash = MinHash(num_perm)
+        self._signatures: list[tuple[int, ...]] = []
+
+    def add(self, text: str) -> None:
+        self._signatures.append(self._minhash.signature(shingles(text)))
+
+    def is_duplicate(self, text: str) -> bool:
+        signature = self._minhash.signature(shingles(text))
+        return any(
+            MinHash.similarity(signature, seen) >= self.threshold
+            for seen in self._signatures
+        )
+
+    def filter(self, texts: Iterable[str], limit: int | None = None) -> List[str]:
+        """
+        Returns the texts that are not near-duplicates of the remembered texts or of
+        each other, keeping at most limit of them. Kept texts are remembered.
+        """
+        kept = []
+        for text in texts:
+            if limit is not None and len(kept) >= limit:
+                break
+            if not text.strip() or self.is_duplicate(text):
+                continue
+            self.add(text)
+            kept.append(text)
+        return kept
@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from langchain_core.messages import BaseMessage
+
+# Metadata keys set on the model calls whose tokens are streamed to the caller
+SECTION_METADATA = "section"
+SECTION_NUMBER_METADATA = "section_number"
+ITERATION_METADATA = "iteration"
+
+
+@dataclass
+class TokenChunk:
+    """
+    A piece of the text generated by a writer node, as soon as the model produced it.
+
+    Attributes:
+        text (str): Generated text
+        node (str): Name of the graph node making the model call
+        section (str): Name of the section being written
+        section_number (int): Number of the section in the article
+        iteration (int | None): Search iteration of a researched section, None for the final sections
+    """
+
+    text: str
+    node: str
+    section: str
+    section_number: int
+    iteration: Optional[int] = None
+
+
+def section_metadata(section, iteration: Optional[int] = None) -> Dict[str, Any]:
+    """Metadata tagging the model calls writing the section, so that their tokens are streamed."""
+    return {
+        SECTION_METADATA: section.name,
+        SECTION_NUMBER_METADATA: section.section_number,
+        ITERATION_METADATA: iteration,
+    }
+
+
+def content_text(content) -> str:
+    """Returns the text of a message content, joining the text blocks of the Converse API."""
+    if isinstance(content, list):
+        return "".join(
+            block if isinstance(block, str) else block.get("text", "")
+            for block in content
+            if isinstance(block, str) or block.get("type", "text") == "text"
+        )
+    return content
+
+
+def to_token_chunk(message: BaseMessage, metadata: Dict[str, Any]) -> Optional[TokenChunk]:
+    """Returns the text of a streamed message chunk with its origin, None if not streamed to the caller."""
+    if SECTION_METADATA not in metadata:
+        return None
+
+    content = content_text(message.content)
+    if not content:
+        return None
+
+    return TokenChunk(
+        text=content,
+        node=metadata.get("langgraph_node", ""),
+        section=metadata[SECTION_METADATA],
+        section_number=metadata[SECTION_NUMBER_METADATA],
+        iteration=metadata.get(ITERATION_METADATA),
+    )
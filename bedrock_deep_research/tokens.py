@@ -0,0 +1,27 @@
+import math
+import re
+
+# Words are split into sub-word tokens of about this many characters
+_CHARS_PER_SUBWORD = 5
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens of the text without a tokenizer: each punctuation
+    mark counts as one token and each word as one token per started 5 characters.
+    """
+    return sum(
+        math.ceil(len(match.group()) / _CHARS_PER_SUBWORD)
+        for match in _TOKEN_PATTERN.finditer(text)
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts the text after the estimated max_tokens-th token."""
+    tokens = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        tokens += math.ceil(len(match.group()) / _CHARS_PER_SUBWORD)
+        if tokens > max_tokens:
+            return text[: match.start()].rstrip() + "... [truncated]"
+    return text
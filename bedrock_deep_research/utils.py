@@ -1,10 +1,8 @@
+import asyncio
 import logging
-import random
 import re
-import time
-from functools import wraps
-
-from botocore.exceptions import ClientError
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 logger = logging.getLogger(__name__)
 
@@ -17,86 +15,98 @@ class CustomError(Exception):
         return self.message
 
 
-def exponential_backoff_retry(
-    ExceptionToCheck, max_retries: int = 5, initial_delay: float = 1.0
-):
+class EventLoopThread:
     """
-    Decorator that implements exponential backoff retry logic.
+    Runs a long-lived asyncio event loop in a background thread.
 
-    Args:
-        func: Function to retry
-        ExceptionToCheck: Exception class to check for retrying
-        max_retries: Maximum number of retry attempts
-        initial_delay: Initial delay in seconds before first retry
+    Synchronous callers submit coroutines with `run`, so every coroutine shares the
+    same loop and the async clients bound to it keep their connections warm.
     """
 
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            delay = initial_delay
-
-            for attempt in range(max_retries + 1):
-                try:
-                    return func(*args, **kwargs)
-                except ClientError as e:
-                    if e.response['Error']['Code'] == 'ExpiredTokenException':
-                        logger.error(
-                            "Expired token error. Please check/update your Security Token included in the request")
-                        # Do not try max_retry times
-                        attempt = max_retries
-                        raise CustomError(
-                            message="Expired Token. Please update the AWS credentials, to connect to the boto Client.")
-                    elif e.response['Error']['Code'] == 'ThrottlingException':
-                        if attempt == max_retries:
-                            logger.error(
-                                f"Error code: {e.response['Error']['Code']}"
-                                f"Execution failed after {max_retries} attempts due to throttling. Try again later.")
-                            raise CustomError(
-                                message=f"Throttling Exception raised.. Retry limit of {max_retries} retries reached.")
-                        logger.info(
-                            f"Attempt {attempt+1} failed due to throttling. Retrying...")
-                        # Add jitter to avoid thundering herd problem
-                        jitter = random.uniform(0, 0.1 * delay)
-                        sleep_time = delay + jitter
-                        logger.debug(
-                            f"Retrying in {sleep_time:.2f} seconds..."
-                        )
-                        time.sleep(sleep_time)
-                        delay *= 2  # Exponential backoff
-                    else:
-                        logger.error(f"Client Error Raised: {e}")
-                        raise e
-                except ExceptionToCheck as e:
-                    logger.error(f"Error raised by {func.__name__}: {e}")
-                    raise e
-        return wrapper
-
-    return decorator
-
-
-def format_web_search(search_response, max_tokens_per_source, include_raw_content=True):
-    # Format output
-    formatted_text = "Sources:\n\n"
-    for i, source in enumerate(search_response, 1):
-        formatted_text += f"Source {source['title']}:\n===\n"
-        formatted_text += f"URL: {source['url']}\n===\n"
-        formatted_text += (
-            f"Most relevant content from source: {source['content']}\n===\n"
-        )
-        if include_raw_content:
-            # Using rough estimate of 4 characters per token
-            char_limit = max_tokens_per_source * 4
-            # Handle None raw_content
-            raw_content = source.get("raw_content", "")
-            if raw_content is None:
-                raw_content = ""
-                logger.warning(
-                    f"Warning: No raw_content found for source {source['url']}")
-            if len(raw_content) > char_limit:
-                raw_content = raw_content[:char_limit] + "... [truncated]"
-            formatted_text += f"Full source content limited to {max_tokens_per_source} tokens: {raw_content}\n\n"
-
-    return formatted_text.strip()
+    def __init__(self, name: str = "bedrock-deep-research-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def _run_forever(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro):
+        """Runs the coroutine on the loop and blocks until it returns."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError(
+                "EventLoopThread.run cannot be called from its own loop")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self):
+        """Stops the loop and waits for the thread to exit."""
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+_shared_event_loop: EventLoopThread | None = None
+_shared_event_loop_lock = threading.Lock()
+
+
+def get_event_loop_thread() -> EventLoopThread:
+    """Returns the process-wide event loop thread, started on first use."""
+    global _shared_event_loop
+    with _shared_event_loop_lock:
+        if _shared_event_loop is None or _shared_event_loop.loop.is_closed():
+            _shared_event_loop = EventLoopThread()
+        return _shared_event_loop
+
+
+TRACKING_QUERY_PARAMS = frozenset(
+    ["fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref", "ref_src",
+     "source", "amp", "outputtype", "cmpid", "_ga", "_hsenc", "_hsmi"]
+)
+MIRROR_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes a URL so that variants of the same page compare equal: scheme, mirror
+    host prefixes (www, mobile, AMP), default ports, trailing slashes, AMP path
+    suffixes, tracking parameters and fragments are ignored.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        # e.g. an unclosed IPv6 bracket, only identical URLs compare equal
+        return url.strip()
+
+    try:
+        port = parts.port
+        host = (parts.hostname or "").lower()
+    except ValueError:
+        # Malformed port, the host is kept as written
+        port = None
+        host = parts.netloc.rpartition("@")[2].lower()
+    for prefix in MIRROR_HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = parts.path
+    for suffix in ("/amp", "/amp/", ".amp", "/index.html"):
+        if path.endswith(suffix):
+            path = path[: -len(suffix)]
+    path = path.rstrip("/")
+
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_QUERY_PARAMS
+    ))
+
+    return urlunsplit(("https", host, path, query, ""))
 
 
 def extract_xml_content(text: str, tag_name: str) -> str | None:
@@ -1,101 +1,664 @@
 import asyncio
+import concurrent.futures
 import hashlib
 import json
 import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 
-from tavily import AsyncTavilyClient
+from .limiters import RateLimiter
+from .metrics import record_search
+from .page_store import PageStore
+from .search_backends import ReplaySearchBackend, SearchBackend
+from .similarity import hamming_distance, simhash
+from .utils import canonicalize_url
 
 logger = logging.getLogger(__name__)
 
 
+class SearchError(Exception):
+    """Raised when none of the search queries could be completed."""
+
+
+@dataclass
+class QueryResults:
+    """Results of a single search query, or the error that made it fail."""
+
+    query: str
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[BaseException] = None
+
+
+@dataclass
+class SearchResults:
+    """Deduplicated results of a batch of search queries, and the queries that failed with their error."""
+
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    failed: List[QueryResults] = field(default_factory=list)
+
+    @property
+    def failed_queries(self) -> List[str]:
+        return [failed.query for failed in self.failed]
+
+
+class SearchCache:
+    """
+    A thread-safe read-through cache for web search responses.
+
+    Entries are kept in memory in LRU order and, when a cache directory is given,
+    persisted as one JSON file per entry so they survive across runs.
+
+    Attributes:
+        cache_dir (str | None): Directory where entries are persisted, None for memory only
+        ttl_seconds (float): Age after which an entry is considered stale
+        max_entries (int): Maximum number of entries kept before evicting the least recently used
+        hits (int): Number of lookups served from the cache
+        misses (int): Number of lookups not found or expired
+        evictions (int): Number of entries dropped to respect max_entries
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = "search_cache",
+        ttl_seconds: float = 86400,
+        max_entries: int = 1000,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # key -> (created_at, response). The response is None until loaded from disk.
+        self._entries: OrderedDict[str, tuple[float, Optional[Dict[str, Any]]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+        if self.cache_dir:
+            self._load_index()
+
+    @staticmethod
+    def make_key(query: str, **search_params: Any) -> str:
+        """Builds a cache key from the normalized query and the search parameters."""
+        normalized_query = " ".join(query.lower().split())
+        payload = json.dumps(
+            {"query": normalized_query, **search_params}, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached response for the key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            created_at, response = entry
+            if time.time() - created_at > self.ttl_seconds:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            if response is None:
+                response = self._read_entry(key)
+                if response is None:
+                    self._remove(key)
+                    self.misses += 1
+                    return None
+                self._entries[key] = (created_at, response)
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def set(self, key: str, response: Dict[str, Any]) -> None:
+        """Stores a response, evicting the least recently used entries if needed."""
+        with self._lock:
+            self._entries[key] = (time.time(), response)
+            self._entries.move_to_end(key)
+            self._write_entry(key, response)
+
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"cache_{key}.json"
+
+    def _load_index(self) -> None:
+        """Registers the entries already on disk, oldest first, without reading them."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = sorted(self.cache_dir.glob("cache_*.json"),
+                       key=lambda p: p.stat().st_mtime)
+        now = time.time()
+        for file_path in files:
+            created_at = file_path.stat().st_mtime
+            key = file_path.stem[len("cache_"):]
+            if now - created_at > self.ttl_seconds:
+                file_path.unlink(missing_ok=True)
+                continue
+            self._entries[key] = (created_at, None)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _read_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unable to read search cache entry {key}: {e}")
+            return None
+
+    def _write_entry(self, key: str, response: Dict[str, Any]) -> None:
+        if not self.cache_dir:
+            return
+        try:
+            file_path = self._path(key)
+            tmp_path = file_path.with_suffix(".tmp")
+            tmp_path.write_text(
+                json.dumps(response, ensure_ascii=False), encoding="utf-8"
+            )
+            tmp_path.replace(file_path)
+        except OSError as e:
+            logger.warning(f"Unable to write search cache entry {key}: {e}")
+
+    def _remove(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self.cache_dir:
+            self._path(key).unlink(missing_ok=True)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls sharing the same key so that only one is executed.
+
+    The first caller for a key runs the call, every caller arriving while it is in flight
+    awaits the same result. Results are shared through a concurrent future so callers
+    running on different event loops or threads can wait on it.
+
+    Attributes:
+        executed (int): Number of calls actually executed
+        coalesced (int): Number of calls served by an in-flight call
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self._calls: Dict[str, concurrent.futures.Future] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = concurrent.futures.Future()
+                self._calls[key] = future
+                self.executed += 1
+                # The call runs detached from its first caller, so that cancelling
+                # that caller does not fail the others waiting for the result
+                task = asyncio.ensure_future(fn())
+                self._tasks.add(task)
+                task.add_done_callback(
+                    lambda t: self._complete(key, future, t))
+            else:
+                self.coalesced += 1
+
+        # Shield so that a cancelled caller does not cancel the shared call
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def _complete(self, key: str, future: concurrent.futures.Future, task: asyncio.Task) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+            self._tasks.discard(task)
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced}
+
+
+class SourceDeduplicator:
+    """
+    Keeps a single copy of each source across the batches of results added to it.
+
+    Sources are duplicates if their canonical URLs match or if their content is
+    near-identical (syndicated copies, mirrors). Within a batch the copy with the
+    highest score is kept.
+
+    Attributes:
+        max_distance (int): Maximum SimHash distance between two copies of the same content
+    """
+
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        self._seen_urls: set[str] = set()
+        self._fingerprints: List[int] = []
+
+    def add(self, sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Returns the sources of the batch not seen before, best scored first."""
+        unique_sources = []
+        for source in sorted(sources, key=lambda s: s.get("score") or 0.0, reverse=True):
+            url = canonicalize_url(source["url"])
+            if url in self._seen_urls:
+                continue
+
+            text = source.get("raw_content") or source.get("content") or ""
+            fingerprint = simhash(text) if text.strip() else None
+            if fingerprint is not None and any(
+                hamming_distance(fingerprint, seen) <= self.max_distance
+                for seen in self._fingerprints
+            ):
+                logger.debug(f"Skipping near-duplicate source {source['url']}")
+                continue
+
+            self._seen_urls.add(url)
+            if fingerprint is not None:
+                self._fingerprints.append(fingerprint)
+            unique_sources.append(source)
+
+        return unique_sources
+
+
 class WebSearch:
     """
-    A class to perform concurrent web searches using the Tavily API.
+    A class to perform concurrent web searches through a search backend.
 
     Attributes:
+        backend (SearchBackend): Search provider, e.g. Tavily or a replay of saved results
         output_dir (str): Directory to save search results
         save_search_results (bool): Whether to save search results to files
-        tavily_async (AsyncTavilyClient): Async client for Tavily API
+        cache (SearchCache | None): Read-through cache for search responses
+        single_flight (SingleFlight): Coalesces identical in-flight queries
+        rate_limiter (RateLimiter | None): Limits the rate and concurrency of backend requests
+        include_raw_content (bool): Whether to request the full page content with every search
+        page_store (PageStore | None): Stores full page contents, referenced by hash from results
+        timeout (float): Seconds after which a query is abandoned
+        hedge_percentile (float | None): Latency percentile after which a duplicate
+            request is sent for a slow query, None disables hedging
     """
 
     MAX_RESULTS = 5
     SEARCH_TOPIC = "general"
+    # Maximum SimHash distance (out of 64 bits) between two sources considered copies
+    # of the same content. Unrelated texts are around 32 bits apart.
+    NEAR_DUPLICATE_DISTANCE = 10
+    # Latencies kept to compute the hedging threshold, and the minimum needed to hedge
+    LATENCY_SAMPLES = 200
+    MIN_HEDGE_SAMPLES = 20
 
     def __init__(
         self,
-        tavily_api_key: str,
+        backend: SearchBackend,
         save_search_results: bool = False,
         output_dir: str = "search_results",
+        cache: Optional[SearchCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        timeout: float = 30.0,
+        hedge_percentile: Optional[float] = None,
+        include_raw_content: bool = False,
+        page_store: Optional[PageStore] = None,
     ):
+        self.backend = backend
         self.output_dir = output_dir
         self.save_search_results = save_search_results
-        self.tavily_async = AsyncTavilyClient(api_key=tavily_api_key)
+        self.cache = cache
+        self.single_flight = SingleFlight()
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.include_raw_content = include_raw_content
+        self.page_store = page_store
+        self._latencies: deque[float] = deque(maxlen=self.LATENCY_SAMPLES)
+        self._counters = {"failed": 0, "timeouts": 0,
+                          "hedged": 0, "hedge_wins": 0}
+        self._counters_lock = threading.Lock()
 
-    async def search(self, search_queries: List[str]) -> List[Dict[str, Any]]:
+    async def search(self, search_queries: List[str]) -> SearchResults:
         """
-        Performs concurrent web searches using the Tavily API.
+        Performs concurrent web searches using the search backend.
+        Queries found in the cache are not sent to the backend, and identical queries
+        already in flight share a single request. Failed or timed out queries are
+        reported with their error, the results of the other queries are still returned.
 
         Args:
             search_queries (List[SearchQuery]): List of search queries to process
 
+        Raises:
+            SearchError: If every query failed
+
         Returns:
-                List[dict]: List of search responses from Tavily API, one per query. Each response has format:
+                SearchResults: The failed queries with their error, and the search results of
+                the other queries without duplicates. Each result has format:
                     {
-                        'query': str, # The original search query
-                        'follow_up_questions': None,
-                        'answer': None,
-                        'images': list,
-                        'results': [                     # List of search results
-                            {
-                                'title': str,            # Title of the webpage
-                                'url': str,              # URL of the result
-                                'content': str,          # Summary/snippet of content
-                                'score': float,          # Relevance score
-                                'raw_content': str|None  # Full page content if available
-                            },
-                            ...
-                        ]
+                        'title': str,            # Title of the webpage
+                        'url': str,              # URL of the result
+                        'content': str,          # Summary/snippet of content
+                        'score': float,          # Relevance score
+                        'raw_content': str|None  # Full page content, if requested and no page store
+                        'raw_content_hash': str  # Page store hash of the full page content, if stored
                     }
         """
+        self._validate_queries(search_queries)
+
+        # Execute all searches concurrently
+        start = time.monotonic()
+        responses = await asyncio.gather(
+            *(self._search_query(query) for query in search_queries),
+            return_exceptions=True,
+        )
+        record_search(len(search_queries), time.monotonic() - start)
+
+        search_docs = []
+        failed = []
+        for query, response in zip(search_queries, responses):
+            if isinstance(response, BaseException):
+                logger.warning(f"Search failed for query '{query}': {response!r}")
+                failed.append(QueryResults(query=query, error=response))
+            else:
+                search_docs.append(response)
+
+        if not search_docs:
+            raise SearchError(
+                f"All {len(search_queries)} search queries failed") from failed[0].error
+
+        unique_docs = self._deduplicate_sources(search_docs)
+
+        if self.save_search_results:
+            await self._save_search_docs(search_docs)
+
+        return SearchResults(results=unique_docs, failed=failed)
+
+    async def search_stream(
+        self, search_queries: List[str]
+    ) -> AsyncIterator[QueryResults]:
+        """
+        Performs concurrent web searches and yields the results of each query as soon
+        as it completes, so a slow query does not hold back the others.
+
+        Args:
+            search_queries (List[str]): List of search queries to process
+
+        Yields:
+            QueryResults: The query and its results not already yielded for an earlier
+                query, in the same format as the results returned by search, or the
+                error if the query failed. Searches still pending when the consumer
+                stops iterating are cancelled.
+        """
+        self._validate_queries(search_queries)
+
+        async def search_query(query: str):
+            try:
+                return query, await self._search_query(query), None
+            except Exception as e:
+                return query, None, e
+
+        start = time.monotonic()
+        tasks = [asyncio.ensure_future(search_query(query))
+                 for query in search_queries]
+        deduplicator = SourceDeduplicator(self.NEAR_DUPLICATE_DISTANCE)
+        search_docs = []
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                query, docs, error = await next_completed
+                if error is not None:
+                    logger.warning(f"Search failed for query '{query}': {error!r}")
+                    yield QueryResults(query=query, error=error)
+                    continue
+                search_docs.append(docs)
+                yield QueryResults(query=query, results=deduplicator.add(docs["results"]))
+        finally:
+            for task in tasks:
+                task.cancel()
+            record_search(len(search_queries), time.monotonic() - start)
+
+        if self.save_search_results:
+            await self._save_search_docs(search_docs)
+
+    def _validate_queries(self, search_queries: List[str]) -> None:
         if not search_queries:
             raise ValueError("Search queries list cannot be empty")
 
         if not all(isinstance(query, str) for query in search_queries):
             raise ValueError("All search queries must be strings")
 
-        search_tasks = []
-        for query in search_queries:
-            search_tasks.append(
-                self.tavily_async.search(
-                    query,
-                    max_results=self.MAX_RESULTS,
-                    include_raw_content=True,
-                    topic=self.SEARCH_TOPIC,
+    async def _search_query(self, query: str) -> Dict[str, Any]:
+        key = self._cache_key(query)
+        if self.cache:
+            # The cache reads and writes its JSON files in a worker thread, off the event loop
+            cached_docs = await asyncio.to_thread(self.cache.get, key)
+            if cached_docs is not None:
+                return cached_docs
+
+        async def fetch():
+            try:
+                docs = await self._hedged_search(query)
+            except Exception:
+                self._increment("failed")
+                raise
+            # The page files are written in a worker thread, off the event loop
+            docs = await asyncio.to_thread(self._store_raw_content, docs)
+            if self.cache:
+                await asyncio.to_thread(self.cache.set, key, docs)
+            return docs
+
+        return await self.single_flight.do(key, fetch)
+
+    async def _hedged_search(self, query: str) -> Dict[str, Any]:
+        """
+        Runs the backend request within the timeout. If hedging is enabled and the
+        request is slower than the latency percentile, a duplicate request is sent and
+        the first successful response wins.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        hedge_delay = self._hedge_delay()
+        hedge_at = None
+
+        # The hedge clock starts when the primary request leaves the rate limiter queue,
+        # a duplicate of a queued request would only queue behind it
+        sent = asyncio.Event()
+        primary = asyncio.ensure_future(self._limited_search(query, sent))
+        sent_waiter = asyncio.ensure_future(
+            sent.wait()) if hedge_delay is not None else None
+        pending = {primary}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                wake_at = min(deadline, hedge_at) if hedge_at else deadline
+                done, _ = await asyncio.wait(
+                    pending | {sent_waiter} if sent_waiter else pending,
+                    timeout=max(0.0, wake_at - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED,
                 )
-            )
+                if sent_waiter in done:
+                    done.discard(sent_waiter)
+                    sent_waiter = None
+                    hedge_at = loop.time() + hedge_delay
+                pending -= done
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._increment("hedge_wins")
+                        return task.result()
+                    error = task.exception()
 
-        # Execute all searches concurrently
-        search_docs = await asyncio.gather(*search_tasks)
+                if not pending:
+                    break
+                if hedge_at and loop.time() >= hedge_at:
+                    logger.debug(
+                        f"Hedging search for '{query}' after {hedge_delay:.2f}s")
+                    self._increment("hedged")
+                    pending.add(asyncio.ensure_future(
+                        self._limited_search(query)))
+                    hedge_at = None
+                elif loop.time() >= deadline:
+                    self._increment("timeouts")
+                    raise TimeoutError(
+                        f"Search timed out after {self.timeout}s")
+        finally:
+            for task in pending:
+                task.cancel()
+            if sent_waiter is not None:
+                sent_waiter.cancel()
 
-        unique_docs = self._deduplicate_sources_by_url(search_docs)
+        raise error
 
-        if self.save_search_results:
-            await self._save_search_docs(search_docs)
+    async def _limited_search(self, query: str, sent: Optional[asyncio.Event] = None) -> Dict[str, Any]:
+        if self.rate_limiter:
+            async with self.rate_limiter:
+                if sent is not None:
+                    sent.set()
+                return await self._backend_search(query)
+        if sent is not None:
+            sent.set()
+        return await self._backend_search(query)
+
+    async def _backend_search(self, query: str) -> Dict[str, Any]:
+        start = time.monotonic()
+        docs = await self.backend.search(
+            query,
+            max_results=self.MAX_RESULTS,
+            include_raw_content=self.include_raw_content,
+            topic=self.SEARCH_TOPIC,
+        )
+        self._latencies.append(time.monotonic() - start)
+        return docs
 
-        return unique_docs
+    async def with_raw_content(self, sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Returns copies of the sources with their full page content in raw_content.
+
+        Content is read from the page store when the source references it, otherwise
+        the missing pages are extracted from the backend in a single request and stored.
+        Sources whose page cannot be retrieved get a None raw_content.
+        """
+        sources = [dict(source) for source in sources]
+        # The page files are read and written in a worker thread, off the event loop
+        missing = await asyncio.to_thread(self._read_raw_content, sources)
 
-    def _deduplicate_sources_by_url(self, search_response) -> List[Dict[str, Any]]:
-        # Collect all results
+        urls = list(dict.fromkeys(source["url"] for source in missing))
+        if not urls:
+            return sources
+
+        try:
+            if self.rate_limiter:
+                async with self.rate_limiter:
+                    extracted = await asyncio.wait_for(self.backend.extract(urls), self.timeout)
+            else:
+                extracted = await asyncio.wait_for(self.backend.extract(urls), self.timeout)
+        except Exception as e:
+            logger.warning(f"Unable to extract {len(urls)} pages: {e!r}")
+            return sources
+
+        await asyncio.to_thread(self._write_raw_content, missing, extracted)
+        return sources
+
+    def _read_raw_content(self, sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Sets the raw_content of the sources from the page store, returns the sources not found."""
+        missing = []
+        for source in sources:
+            if source.get("raw_content"):
+                continue
+            content_hash = source.get("raw_content_hash")
+            if not content_hash and self.page_store:
+                content_hash = self.page_store.hash_for_url(source["url"])
+            content = self.page_store.get(
+                content_hash) if content_hash and self.page_store else None
+            if content is None:
+                missing.append(source)
+            source["raw_content"] = content
+        return missing
+
+    def _write_raw_content(self, sources: List[Dict[str, Any]], extracted: Dict[str, str]) -> None:
+        """Sets the raw_content of the sources from the extracted pages and stores them."""
+        for source in sources:
+            content = extracted.get(source["url"])
+            source["raw_content"] = content
+            if content and self.page_store:
+                source["raw_content_hash"] = self.page_store.put(
+                    content, url=source["url"])
+
+    def _store_raw_content(self, docs: Dict[str, Any]) -> Dict[str, Any]:
+        """Moves the full page contents of a response to the page store, keeping their hash."""
+        if not self.page_store or not any(r.get("raw_content") for r in docs.get("results", [])):
+            return docs
+
+        results = []
+        for result in docs["results"]:
+            result = dict(result)
+            raw_content = result.pop("raw_content", None)
+            if raw_content:
+                result["raw_content_hash"] = self.page_store.put(
+                    raw_content, url=result["url"])
+            results.append(result)
+        return {**docs, "results": results}
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Returns the latency percentile after which to hedge, None if not hedging."""
+        if not self.hedge_percentile or len(self._latencies) < self.MIN_HEDGE_SAMPLES:
+            return None
+        samples = sorted(self._latencies)
+        return samples[min(len(samples) - 1, int(len(samples) * self.hedge_percentile))]
+
+    def _increment(self, counter: str) -> None:
+        with self._counters_lock:
+            self._counters[counter] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns the web search counters."""
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {
+            "cache": self.cache.stats() if self.cache else None,
+            "requests": {**self.single_flight.stats(), **counters},
+            "rate_limiter": self.rate_limiter.stats() if self.rate_limiter else None,
+        }
+
+    def _cache_key(self, query: str) -> str:
+        return SearchCache.make_key(
+            query,
+            backend=self.backend.name,
+            max_results=self.MAX_RESULTS,
+            topic=self.SEARCH_TOPIC,
+            include_raw_content=self.include_raw_content,
+        )
+
+    def _deduplicate_sources(self, search_response) -> List[Dict[str, Any]]:
+        """Collects the results of all responses, keeping a single copy of each source."""
         sources_list = []
         for response in search_response:
             sources_list.extend(response["results"])
 
-        # Deduplicate by URL
-        unique_sources = {source["url"]: source for source in sources_list}
-
-        return unique_sources.values()
+        return SourceDeduplicator(self.NEAR_DUPLICATE_DISTANCE).add(sources_list)
 
     async def _save_search_docs(self, search_docs: List[Dict[str, Any]]) -> None:
         """
@@ -111,8 +674,8 @@ class WebSearch:
 
             for docs in search_docs:
 
-                query_hash = hashlib.sha256(docs["query"].encode()).hexdigest()
-                file_path = output_path / f"search_{query_hash}.json"
+                file_path = output_path / \
+                    ReplaySearchBackend.file_name(docs["query"])
 
                 file_path.write_text(
                     json.dumps(docs, indent=2, ensure_ascii=False), encoding="utf-8"
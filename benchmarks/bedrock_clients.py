@@ -0,0 +1,72 @@
+"""
+Compares creating a ChatBedrock (and its boto3 client) for every model call, as the
+nodes used to do, against reusing the chat models of the shared client registry.
+Reports the client creation time and the latency of sequential and concurrent calls.
+
+Usage:
+    python -m benchmarks.bedrock_clients --runs 10 --concurrency 10
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from langchain_aws import ChatBedrock
+from langchain_core.messages import HumanMessage
+
+from bedrock_deep_research.bedrock_clients import BedrockClientRegistry
+from bedrock_deep_research.config import SUPPORTED_MODELS
+
+MODEL_ID = SUPPORTED_MODELS["Anthropic Claude 3.5 Haiku"]
+MAX_TOKENS = 16
+MESSAGES = [HumanMessage(content="Reply with the single word: ok")]
+
+
+def _per_call_client():
+    return ChatBedrock(model_id=MODEL_ID, max_tokens=MAX_TOKENS)
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _summary(name: str, samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return (
+        f"{name:<32} n={len(samples):<4} mean={statistics.mean(samples) * 1000:8.1f}ms "
+        f"p50={statistics.median(samples) * 1000:8.1f}ms p95={p95 * 1000:8.1f}ms"
+    )
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    registry = BedrockClientRegistry(max_pool_connections=args.concurrency)
+
+    def shared_client():
+        return registry.get_chat_model(MODEL_ID, MAX_TOKENS)
+
+    results = {}
+    for name, get_model in [("per-call client", _per_call_client), ("shared client", shared_client)]:
+        results[f"{name} creation"] = [
+            _timed(get_model) for _ in range(args.runs)]
+        results[f"{name} call"] = [
+            _timed(lambda: get_model().invoke(MESSAGES)) for _ in range(args.runs)]
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            results[f"{name} concurrent call"] = list(executor.map(
+                lambda _: _timed(lambda: get_model().invoke(MESSAGES)), range(args.runs)))
+
+    for name, samples in results.items():
+        print(_summary(name, samples))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares per-search latency when every search builds its own event loop
+(the former asyncio.run per node call) against searches sharing one long-lived loop.
+
+Usage:
+    TAVILY_API_KEY=... python -m benchmarks.web_search_latency --runs 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from bedrock_deep_research.search_backends import TavilySearchBackend
+from bedrock_deep_research.utils import EventLoopThread
+from bedrock_deep_research.web_search import WebSearch
+
+QUERIES = [
+    "Amazon S3 presigned URL upload Python boto3",
+    "Amazon Bedrock Converse API streaming example",
+    "LangGraph Send API parallel subgraphs",
+]
+
+
+def _timed_search(run, web_search: WebSearch, query: str) -> float:
+    start = time.perf_counter()
+    run(web_search.search([query]))
+    return time.perf_counter() - start
+
+
+def _summary(name: str, samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return (
+        f"{name:<22} n={len(samples):<4} mean={statistics.mean(samples) * 1000:8.1f}ms "
+        f"p50={statistics.median(samples) * 1000:8.1f}ms p95={p95 * 1000:8.1f}ms"
+    )
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    # No cache, so that every search reaches Tavily
+    web_search = WebSearch(TavilySearchBackend(os.getenv("TAVILY_API_KEY")))
+
+    per_call_loop = [
+        _timed_search(asyncio.run, web_search, QUERIES[i % len(QUERIES)])
+        for i in range(args.runs)
+    ]
+
+    event_loop = EventLoopThread()
+    try:
+        shared_loop = [
+            _timed_search(event_loop.run, web_search,
+                          QUERIES[i % len(QUERIES)])
+            for i in range(args.runs)
+        ]
+    finally:
+        event_loop.close()
+
+    print(_summary("asyncio.run per call", per_call_loop))
+    print(_summary("long-lived loop", shared_loop))
+
+
+if __name__ == "__main__":
+    main()
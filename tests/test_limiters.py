@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from bedrock_deep_research.limiters import (AdaptiveConcurrencyLimit,
+                                            ConcurrencyLimit, TokenBucket)
+
+
+async def _run_tasks(limit: ConcurrencyLimit, tasks: int, duration: float = 0.01) -> int:
+    """Runs the tasks within the limit and returns the highest number in flight at once."""
+    in_flight = peak = 0
+
+    async def task():
+        nonlocal in_flight, peak
+        await limit.acquire()
+        try:
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(duration)
+            in_flight -= 1
+        finally:
+            limit.release()
+
+    await asyncio.gather(*(task() for _ in range(tasks)))
+    return peak
+
+
+def test_concurrency_limit_caps_the_holders():
+    limit = ConcurrencyLimit(2)
+
+    assert asyncio.run(_run_tasks(limit, 6)) == 2
+    assert limit.in_flight == 0
+    assert limit.queue_depth == 0
+
+
+def test_raising_the_limit_wakes_the_waiters():
+    async def scenario():
+        limit = ConcurrencyLimit(1)
+        await limit.acquire()
+        waiters = [asyncio.create_task(limit.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert limit.queue_depth == 2
+
+        limit.set_limit(3)
+        await asyncio.wait_for(asyncio.gather(*waiters), timeout=1)
+        return limit.in_flight
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_cancelled_waiter_does_not_take_a_slot():
+    async def scenario():
+        limit = ConcurrencyLimit(1)
+        await limit.acquire()
+        waiter = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limit.release()
+        return limit
+
+    limit = asyncio.run(scenario())
+
+    assert limit.in_flight == 0
+    assert limit.queue_depth == 0
+
+
+def test_token_bucket_spaces_the_requests_after_the_burst():
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    delays = [bucket.reserve() for _ in range(4)]
+
+    assert delays[:2] == [0.0, 0.0]
+    assert delays[2] == pytest.approx(0.1, abs=0.01)
+    assert delays[3] == pytest.approx(0.2, abs=0.01)
+
+
+def _acquire_all(limit: AdaptiveConcurrencyLimit, calls: int) -> list[int]:
+    async def acquire_all():
+        return [await limit.acquire() for _ in range(calls)]
+    return asyncio.run(acquire_all())
+
+
+def test_adaptive_limit_halves_once_per_burst_of_throttles():
+    limit = AdaptiveConcurrencyLimit("test-model", initial_limit=8)
+    epochs = _acquire_all(limit, 8)
+
+    for epoch in epochs:
+        limit.record_throttle(epoch)
+        limit.release()
+
+    assert limit.slots.limit == 4
+    assert limit.stats()["decreases"] == 1
+
+    # Calls started after the cut are throttled in a new epoch
+    epoch = _acquire_all(limit, 1)[0]
+    limit.record_throttle(epoch)
+    limit.release()
+
+    assert limit.slots.limit == 2
+
+
+def test_adaptive_limit_grows_by_one_per_window_of_successes():
+    limit = AdaptiveConcurrencyLimit("test-model", initial_limit=2, max_limit=3)
+
+    # 2 -> 2.5 -> 2.9, then above 3 on the third success
+    for _ in range(2):
+        limit.record_success()
+    assert limit.slots.limit == 2
+
+    limit.record_success()
+    assert limit.slots.limit == 3
+
+    for _ in range(10):
+        limit.record_success()
+    assert limit.slots.limit == 3
@@ -0,0 +1,90 @@
+from langchain_core.messages import HumanMessage
+
+from bedrock_deep_research import prompt_cache
+from bedrock_deep_research.bedrock_clients import BedrockClientRegistry
+from bedrock_deep_research.config import get_model_settings
+from bedrock_deep_research.nodes.final_sections_writer import \
+    final_section_writer_instructions
+from bedrock_deep_research.nodes.section_writer import (
+    section_grader_instructions, section_writer_instructions)
+from bedrock_deep_research.prompt_cache import (CACHE_POINT,
+                                                PromptCacheStats,
+                                                cache_token_usage,
+                                                cacheable_system_message,
+                                                caches_prefix,
+                                                create_chat_model)
+
+MODEL_ID = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
+
+
+class ConverseStub:
+    """A bedrock-runtime client answering the Converse API, recording the requests."""
+
+    def __init__(self):
+        self.requests = []
+
+    def converse(self, **request):
+        self.requests.append(request)
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": "ok"}]}},
+            "stopReason": "end_turn",
+            "usage": {
+                "inputTokens": 10,
+                "outputTokens": 1,
+                "totalTokens": 11,
+                "cacheReadInputTokens": 1500,
+                "cacheWriteInputTokens": 200,
+            },
+            "metrics": {"latencyMs": 10},
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+        }
+
+
+def _long_instructions() -> str:
+    min_tokens = get_model_settings(MODEL_ID).min_cache_tokens
+    return "Follow the editorial guidelines of the article carefully. " * min_tokens
+
+
+def test_short_prefixes_are_not_cached():
+    instructions = [
+        section_writer_instructions.format(writing_guidelines="- Strict 200 word limit"),
+        section_grader_instructions,
+        final_section_writer_instructions,
+    ]
+    for model_id in [MODEL_ID, "us.anthropic.claude-3-5-haiku-20241022-v1:0"]:
+        for text in instructions:
+            assert not caches_prefix(text, model_id)
+            assert cacheable_system_message(text, caches_prefix(text, model_id)).content == text
+
+
+def test_prefix_is_cached_only_when_long_enough_and_supported():
+    instructions = _long_instructions()
+
+    assert caches_prefix(instructions, MODEL_ID)
+    assert not caches_prefix(instructions, MODEL_ID, prompt_caching=False)
+    # No prompt caching for Claude 3.5 Sonnet v2
+    assert not caches_prefix(instructions, "us.anthropic.claude-3-5-sonnet-20241022-v2:0")
+
+
+def test_cache_point_is_sent_to_converse(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    stub = ConverseStub()
+    registry = BedrockClientRegistry()
+    monkeypatch.setattr(registry, "_get_client", lambda region: stub)
+    monkeypatch.setattr(prompt_cache, "get_bedrock_clients", lambda: registry)
+
+    instructions = _long_instructions()
+    model = create_chat_model(MODEL_ID, prompt_caching=caches_prefix(instructions, MODEL_ID))
+    message = model.invoke([
+        cacheable_system_message(instructions, True),
+        HumanMessage(content="Write the section"),
+    ])
+
+    assert len(stub.requests) == 1
+    system = stub.requests[0]["system"]
+    assert system[0]["text"] == instructions
+    assert system[-1] == CACHE_POINT
+    assert cache_token_usage(message) == (1500, 200)
+    stats = PromptCacheStats()
+    stats.record(message)
+    assert stats.get_stats()["cache_read_tokens"] == 1500
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+from bedrock_deep_research.retry import (CircuitBreaker, CircuitOpenError,
+                                         RetryBudget, RetryEngine)
+from bedrock_deep_research.utils import CustomError
+
+
+def client_error(code: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, "Converse")
+
+
+class FailingCall:
+    """Raises the given errors, one per call, then returns 'ok'."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def _engine(failure_threshold=3, reset_timeout=30.0, budget=None) -> RetryEngine:
+    # No delay between the attempts
+    return RetryEngine(
+        "test-model",
+        base_delay=0.0,
+        max_delay=0.0,
+        budget=budget or RetryBudget(capacity=100),
+        breaker=CircuitBreaker(failure_threshold, reset_timeout),
+    )
+
+
+def test_throttling_does_not_open_the_circuit():
+    engine = _engine(failure_threshold=3)
+    call = FailingCall(*[client_error("ThrottlingException")] * 5)
+
+    assert engine.call(call) == "ok"
+    assert call.calls == 6
+    assert engine.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_consecutive_failures_open_the_circuit_for_new_calls():
+    engine = _engine(failure_threshold=3)
+    with pytest.raises(CustomError):
+        engine.call(FailingCall(*[client_error("ServiceUnavailableException")] * 3),
+                    max_retries=2)
+
+    assert engine.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        engine.call(FailingCall())
+
+
+def test_retrying_call_waits_for_the_trial_instead_of_failing():
+    engine = _engine(failure_threshold=2, reset_timeout=0.05)
+    engine.CIRCUIT_POLL_INTERVAL = 0.01
+    call = FailingCall(*[client_error("ServiceUnavailableException")] * 2)
+
+    assert engine.call(call, max_retries=3) == "ok"
+    assert engine.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_trial_releases_the_half_open_circuit():
+    engine = _engine(failure_threshold=1, reset_timeout=0.01)
+    engine.breaker.record_failure()
+    time.sleep(0.02)
+    assert engine.breaker.state == CircuitBreaker.HALF_OPEN
+
+    async def cancel_trial():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+
+        task = asyncio.create_task(engine.acall(hang))
+        await started.wait()
+        # The trial is in flight, no other call may go through
+        assert not engine.breaker.allow()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+
+    assert engine.breaker.allow()
+
+
+def test_exhausted_budget_stops_the_retries():
+    engine = _engine(failure_threshold=100, budget=RetryBudget(capacity=1))
+    call = FailingCall(*[client_error("InternalServerException")] * 10)
+
+    with pytest.raises(CustomError, match="Too many retries"):
+        engine.call(call)
+
+    assert call.calls == 2
+    assert engine.get_stats()["retries"] == 1
+
+
+def test_successful_calls_earn_the_budget_back():
+    budget = RetryBudget(capacity=2, ratio=0.5)
+    assert budget.try_spend() and budget.try_spend()
+    assert not budget.try_spend()
+
+    budget.record_success()
+    budget.record_success()
+
+    assert budget.try_spend()
@@ -0,0 +1,141 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from bedrock_deep_research.model import Section
+from bedrock_deep_research.nodes.initial_researcher import InitialResearcher
+from bedrock_deep_research.nodes.section_web_researcher import SectionWebResearcher
+from bedrock_deep_research.retrieval import RunCorpora
+from bedrock_deep_research.web_search import QueryResults, SearchResults
+
+CONFIG = {"configurable": {"use_source_corpus": True, "thread_id": "article-a"}}
+
+SOURCES = [
+    {
+        "title": title,
+        "url": f"https://example.com/bedrock-prompt-caching-{i}",
+        "content": content,
+        "score": 0.9,
+        "raw_content": None,
+    }
+    for i, (title, content) in enumerate([
+        ("Prompt caching in Amazon Bedrock",
+         "Bedrock prompt caching cuts the latency of long prompts by reusing their cached prefix."),
+        ("Reduce your Bedrock bill",
+         "Cached prompt tokens are billed at a discount, prompt caching on Bedrock also lowers latency."),
+        ("Bedrock cache checkpoints explained",
+         "A cachePoint block marks where the prompt caching of Bedrock stops, latency drops on reads."),
+        ("Benchmarking Claude on Bedrock",
+         "We measured the latency of Bedrock with and without prompt caching across many prompt sizes."),
+    ])
+]
+
+
+class FakeWebSearch:
+    """Records the queries sent to the web and answers them with the same sources."""
+
+    def __init__(self, sources=SOURCES):
+        self.queries = []
+        self.sources = sources
+
+    async def search(self, search_queries):
+        self.queries.extend(search_queries)
+        return SearchResults(results=[dict(source) for source in self.sources])
+
+    async def search_stream(self, search_queries):
+        self.queries.extend(search_queries)
+        for query in search_queries:
+            yield QueryResults(query=query, results=[dict(source) for source in self.sources])
+
+
+def test_empty_corpus_is_filled_by_the_initial_research():
+    corpora = RunCorpora()
+    web_search = FakeWebSearch()
+    researcher = InitialResearcher(web_search, corpora)
+    researcher.generate_search_queries = AsyncMock(
+        return_value=["Amazon Bedrock prompt caching"])
+
+    asyncio.run(researcher({"topic": "Amazon Bedrock prompt caching"}, CONFIG))
+
+    assert corpora.stats("article-a")["documents"] == len(SOURCES)
+
+
+def test_section_query_is_served_from_the_corpus_after_initial_research():
+    corpora = RunCorpora(min_results=3)
+    web_search = FakeWebSearch()
+    researcher = InitialResearcher(web_search, corpora)
+    researcher.generate_search_queries = AsyncMock(
+        return_value=["Amazon Bedrock prompt caching"])
+    asyncio.run(researcher({"topic": "Amazon Bedrock prompt caching"}, CONFIG))
+    web_search.queries.clear()
+
+    section = Section(section_number=1, name="Prompt caching",
+                      description="How prompt caching works")
+    result = asyncio.run(SectionWebResearcher(web_search, corpora)(
+        {"section": section, "search_queries": ["Bedrock prompt caching latency"],
+         "search_iterations": 0},
+        CONFIG,
+    ))
+
+    assert web_search.queries == []
+    assert result["query_history"] == ["Bedrock prompt caching latency"]
+    assert len(result["sources"]) >= 3
+    assert corpora.stats("article-a")["covered"] == 1
+
+
+def test_section_query_covered_only_by_its_own_evidence_is_searched_on_the_web():
+    corpora = RunCorpora(min_results=3)
+    corpora.for_config(CONFIG).add(SOURCES)
+    new_source = {
+        "title": "Prompt caching latency in production",
+        "url": "https://example.com/bedrock-prompt-caching-production",
+        "content": "Our production traffic on Bedrock saw lower latency once prompt caching was on.",
+        "score": 0.8,
+        "raw_content": None,
+    }
+    web_search = FakeWebSearch(sources=[new_source])
+
+    section = Section(section_number=1, name="Prompt caching",
+                      description="How prompt caching works")
+    evidence = {source["url"]: source for source in SOURCES}
+    result = asyncio.run(SectionWebResearcher(web_search, corpora)(
+        {"section": section, "search_queries": ["Bedrock prompt caching latency"],
+         "search_iterations": 1, "evidence": evidence},
+        CONFIG,
+    ))
+
+    assert web_search.queries == ["Bedrock prompt caching latency"]
+    assert result["query_history"] == ["Bedrock prompt caching latency"]
+    assert [source.url for source in result["sources"]] == [new_source["url"]]
+
+
+def test_runs_do_not_share_their_corpus():
+    corpora = RunCorpora(min_results=3)
+    web_search = FakeWebSearch()
+    researcher = InitialResearcher(web_search, corpora)
+    researcher.generate_search_queries = AsyncMock(
+        return_value=["Amazon Bedrock prompt caching"])
+    asyncio.run(researcher({"topic": "Amazon Bedrock prompt caching"}, CONFIG))
+    web_search.queries.clear()
+
+    section = Section(section_number=1, name="Prompt caching",
+                      description="How prompt caching works")
+    asyncio.run(SectionWebResearcher(web_search, corpora)(
+        {"section": section, "search_queries": ["Bedrock prompt caching latency"],
+         "search_iterations": 0},
+        {"configurable": {**CONFIG["configurable"], "thread_id": "article-b"}},
+    ))
+
+    assert web_search.queries == ["Bedrock prompt caching latency"]
+    assert corpora.stats("article-b")["covered"] == 0
+
+
+def test_finished_run_drops_its_sources_and_keeps_its_stats():
+    corpora = RunCorpora()
+    corpora.get("article-a").add(SOURCES)
+    corpora.get("article-b").add(SOURCES[:1])
+
+    corpora.drop("article-a")
+
+    assert corpora.stats("article-a")["documents"] == len(SOURCES)
+    assert len(corpora.get("article-a")) == 0
+    assert corpora.stats()["runs"] == 2
@@ -0,0 +1,192 @@
+import asyncio
+import time
+
+from bedrock_deep_research.limiters import RateLimiter
+from bedrock_deep_research.search_backends import SearchBackend
+from bedrock_deep_research.web_search import (SearchCache, SingleFlight,
+                                              SourceDeduplicator, WebSearch)
+
+
+SOURCES = [
+    {
+        "title": f"Prompt caching in Amazon Bedrock, part {i}",
+        "url": f"https://example.com/bedrock-prompt-caching-{i}",
+        "content": content,
+        "score": 0.9,
+        "raw_content": None,
+    }
+    for i, content in enumerate([
+        "Bedrock prompt caching cuts the latency of long prompts by reusing their cached prefix.",
+        "Cached prompt tokens are billed at a discount, which lowers the cost of long agent loops.",
+    ])
+]
+
+
+class PartlyFailingBackend(SearchBackend):
+    """Answers every query with the sources, except the queries containing 'fail'."""
+
+    name = "partly_failing"
+
+    async def search(self, query, max_results, include_raw_content, topic):
+        if "fail" in query:
+            raise ConnectionError(f"Search backend unavailable for '{query}'")
+        return {"query": query, "results": [dict(source) for source in SOURCES]}
+
+
+class SleepingBackend(SearchBackend):
+    """Answers every query after a delay, the first request of a query after first_delay if set."""
+
+    name = "sleeping"
+
+    def __init__(self, delay: float, first_delay: float | None = None):
+        self.delay = delay
+        self.first_delay = first_delay
+        self.requests = []
+
+    async def search(self, query, max_results, include_raw_content, topic):
+        first = query not in self.requests
+        self.requests.append(query)
+        await asyncio.sleep(self.first_delay if first and self.first_delay is not None else self.delay)
+        return {"query": query, "results": []}
+
+
+def test_search_reports_the_failed_queries_with_the_results():
+    web_search = WebSearch(PartlyFailingBackend())
+
+    response = asyncio.run(web_search.search(
+        ["Amazon Bedrock prompt caching", "fail: Bedrock latency"]))
+
+    assert len(response.results) == len(SOURCES)
+    assert response.failed_queries == ["fail: Bedrock latency"]
+    assert isinstance(response.failed[0].error, ConnectionError)
+
+
+def test_malformed_urls_do_not_fail_the_deduplication():
+    deduplicator = SourceDeduplicator(WebSearch.NEAR_DUPLICATE_DISTANCE)
+    sources = [
+        {**SOURCES[0], "url": "http://example.com:abc/bedrock"},
+        {**SOURCES[0], "url": "http://example.com:abc/bedrock/"},
+        {**SOURCES[1], "url": "http://[::1/bedrock"},
+    ]
+
+    unique_sources = deduplicator.add(sources)
+
+    assert [source["url"] for source in unique_sources] == [
+        "http://example.com:abc/bedrock", "http://[::1/bedrock"]
+
+
+def _hedging_web_search(backend, rate_limiter=None, observed_latency=0.1):
+    web_search = WebSearch(backend, rate_limiter=rate_limiter, hedge_percentile=0.9)
+    web_search._latencies.extend([observed_latency] * WebSearch.MIN_HEDGE_SAMPLES)
+    return web_search
+
+
+def test_queries_waiting_for_the_rate_limiter_are_not_hedged():
+    backend = SleepingBackend(delay=0.01)
+    rate_limiter = RateLimiter("test", rate=100, burst=2, max_in_flight=10)
+    web_search = _hedging_web_search(backend, rate_limiter)
+
+    queries = [f"query {i}" for i in range(30)]
+    asyncio.run(web_search.search(queries))
+
+    assert web_search.get_stats()["requests"]["hedged"] == 0
+    assert len(backend.requests) == len(queries)
+
+
+def test_slow_request_in_flight_is_hedged():
+    backend = SleepingBackend(delay=0.01, first_delay=5)
+    web_search = _hedging_web_search(backend, observed_latency=0.05)
+
+    asyncio.run(web_search.search(["slow query"]))
+
+    stats = web_search.get_stats()["requests"]
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
+
+
+def test_search_cache_expires_entries(tmp_path, monkeypatch):
+    cache = SearchCache(cache_dir=str(tmp_path), ttl_seconds=60)
+    cache.set("key", {"query": "q", "results": []})
+    assert cache.get("key") == {"query": "q", "results": []}
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+
+    assert cache.get("key") is None
+    assert list(tmp_path.glob("cache_*.json")) == []
+
+
+def test_search_cache_evicts_the_least_recently_used_entry(tmp_path):
+    cache = SearchCache(cache_dir=str(tmp_path), max_entries=2)
+    cache.set("a", {"query": "a"})
+    cache.set("b", {"query": "b"})
+    cache.get("a")
+
+    cache.set("c", {"query": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"query": "a"}
+    assert cache.get("c") == {"query": "c"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_search_cache_reloads_its_entries_from_disk(tmp_path):
+    SearchCache(cache_dir=str(tmp_path)).set("key", {"query": "q"})
+
+    assert SearchCache(cache_dir=str(tmp_path)).get("key") == {"query": "q"}
+
+
+def test_single_flight_runs_concurrent_identical_calls_once():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"query": "q"}
+
+    async def scenario():
+        return await asyncio.gather(*(single_flight.do("key", fetch) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+
+    assert results == [{"query": "q"}] * 3
+    assert len(calls) == 1
+    assert single_flight.stats() == {"executed": 1, "coalesced": 2}
+
+
+def test_single_flight_survives_the_cancellation_of_its_first_caller():
+    single_flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def scenario():
+        first = asyncio.create_task(single_flight.do("key", fetch))
+        second = asyncio.create_task(single_flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+    assert single_flight.stats()["executed"] == 1
+
+
+def test_single_flight_shares_the_error_and_forgets_the_call():
+    single_flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("backend down")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(single_flight.do("key", fail) for _ in range(2)), return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+
+    assert all(isinstance(error, ConnectionError) for error in errors)
+    # The next call runs again instead of reusing the failure
+    assert isinstance(asyncio.run(scenario())[0], ConnectionError)
+    assert single_flight.stats()["executed"] == 2